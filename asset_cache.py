@@ -0,0 +1,263 @@
+import asyncio
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_RESOURCE_TYPES = ('script', 'stylesheet', 'font', 'image')
+
+# Hop-by-hop or encoding headers that no longer describe the decoded body we store
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie')
+
+# Heuristic freshness for responses with Last-Modified but no explicit lifetime
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_SECONDS = 24 * 3600
+
+# Persist the index every this many stores so a crash loses little
+INDEX_SAVE_INTERVAL = 20
+
+
+def _parse_cache_control(value: str) -> dict:
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def _parse_http_date(value: str):
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: dict, now: float) -> float:
+    """Seconds a response may be served without revalidation, per RFC 9111."""
+    directives = _parse_cache_control(headers.get('cache-control'))
+    if 'no-cache' in directives:
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]))
+            except ValueError:
+                return 0
+    expires = _parse_http_date(headers.get('expires'))
+    if expires is not None:
+        date = _parse_http_date(headers.get('date')) or now
+        return max(0, expires - date)
+    last_modified = _parse_http_date(headers.get('last-modified'))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_SECONDS, max(0, (now - last_modified) * HEURISTIC_FRACTION))
+    return 0
+
+
+class AssetCache:
+    """Shared on-disk cache for the form page's static assets, served through request routing.
+
+    Entries are keyed by URL and keep the response validators (ETag and
+    Last-Modified) so stale entries are revalidated with conditional requests.
+    The cache honours Cache-Control/Expires freshness, never stores ``no-store``
+    responses, and evicts least recently used entries beyond ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir="asset_cache", max_bytes=200 * 1024 * 1024,
+                 resource_types=CACHEABLE_RESOURCE_TYPES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.resource_types = set(resource_types)
+        self.index_path = self.cache_dir / "index.json"
+        self.entries = {}
+        self._index_lock = asyncio.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+    async def start(self):
+        await asyncio.to_thread(self._load_index)
+
+    async def stop(self):
+        await self._persist_index()
+
+    async def install(self, target):
+        """Serve cacheable requests of a page or browser context from the cache."""
+        await target.route("**/*", self._handle_route)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'hit_ratio': (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'bytes_served': self.bytes_served,
+        }
+
+    async def _handle_route(self, route):
+        request = route.request
+        if request.method != 'GET' or request.resource_type not in self.resource_types:
+            await route.fallback()
+            return
+
+        url = request.url
+        entry = self.entries.get(url)
+        now = time.time()
+        if entry and entry['expires_at'] > now:
+            if await self._serve(route, entry):
+                self.hits += 1
+                return
+            entry = None
+
+        headers = dict(request.headers)
+        if entry:
+            if entry.get('etag'):
+                headers['if-none-match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['if-modified-since'] = entry['last_modified']
+
+        try:
+            response = await route.fetch(headers=headers)
+        except Exception as e:
+            logger.error(f"Asset fetch failed for {url}: {str(e)}")
+            await route.abort()
+            return
+
+        if response.status == 304 and entry:
+            entry['expires_at'] = now + freshness_lifetime(response.headers, now)
+            if await self._serve(route, entry):
+                self.revalidated += 1
+                return
+            # The cached body vanished; repeat the request unconditionally
+            response = await route.fetch(headers=dict(request.headers))
+
+        self.misses += 1
+        body = await response.body()
+        await route.fulfill(response=response, body=body)
+        if response.status == 200:
+            await self._store(url, response.headers, body, now)
+
+    async def _serve(self, route, entry: dict) -> bool:
+        try:
+            body = await asyncio.to_thread(self._body_path(entry['key']).read_bytes)
+        except OSError:
+            self._remove(entry['url'])
+            return False
+        entry['last_used'] = time.time()
+        self.bytes_served += len(body)
+        await route.fulfill(status=200, headers=entry['headers'], body=body)
+        return True
+
+    async def _store(self, url: str, headers: dict, body: bytes, now: float):
+        if 'no-store' in _parse_cache_control(headers.get('cache-control')):
+            return
+        lifetime = freshness_lifetime(headers, now)
+        if lifetime <= 0 and not (headers.get('etag') or headers.get('last-modified')):
+            # Could never be served or revalidated
+            return
+        if len(body) > self.max_bytes:
+            return
+
+        key = hashlib.sha256(url.encode()).hexdigest()
+        try:
+            await asyncio.to_thread(self._write_body, key, body)
+        except OSError as e:
+            logger.error(f"Error writing asset cache entry for {url}: {str(e)}")
+            return
+
+        self._remove(url, delete_file=False)
+        self.entries[url] = {
+            'url': url,
+            'key': key,
+            'size': len(body),
+            'headers': {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'expires_at': now + lifetime,
+            'last_used': now,
+        }
+        self.total_bytes += len(body)
+        self.stores += 1
+        self._evict()
+        if self.stores % INDEX_SAVE_INTERVAL == 0:
+            await self._persist_index()
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for entry in sorted(self.entries.values(), key=lambda e: e['last_used']):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._remove(entry['url'])
+            self.evictions += 1
+
+    def _remove(self, url: str, delete_file=True):
+        entry = self.entries.pop(url, None)
+        if not entry:
+            return
+        self.total_bytes -= entry['size']
+        if delete_file:
+            try:
+                self._body_path(entry['key']).unlink()
+            except OSError:
+                pass
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.body"
+
+    def _write_body(self, key: str, body: bytes):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._body_path(key).with_suffix('.tmp')
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, self._body_path(key))
+
+    def _load_index(self):
+        entries = []
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as f:
+                    entries = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading asset cache index: {str(e)}")
+        self.entries = {e['url']: e for e in entries if self._body_path(e['key']).exists()}
+        self.total_bytes = sum(e['size'] for e in self.entries.values())
+        # Drop bodies written after the index was last saved
+        keys = {e['key'] for e in self.entries.values()}
+        for path in self.cache_dir.glob('*.body'):
+            if path.stem not in keys:
+                path.unlink(missing_ok=True)
+        self._evict()
+        logger.info(f"Loaded {len(self.entries)} cached asset(s) ({self.total_bytes} bytes)")
+
+    async def _persist_index(self):
+        async with self._index_lock:
+            # Snapshot on the loop: route handlers add, touch and evict entries while the thread writes
+            records = [dict(entry) for entry in self.entries.values()]
+            await asyncio.to_thread(self._save_index, records)
+
+    def _save_index(self, records: list):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            logger.error(f"Error saving asset cache index: {str(e)}")
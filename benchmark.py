@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from browser_pool import BrowserPool
+from config import BROWSER_VIEWPORT, BROWSER_USER_AGENT
+from direct_submit import DirectSubmitter, SubmissionTemplate
+from form_filler import FormFiller
+from form_schema import FormSchemaCache
+from local_form_server import LocalFormServer
+from proc_stats import ProcessTreeSampler, percentile
+from screenshot_store import ScreenshotStore
+from timing_profiles import get_timing_profile
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('stepwise', 'batch', 'direct')
+
+SAMPLE_USER_DATA = {
+    'salutation': 'Ms',
+    'full_name': 'Jane Tan',
+    'contact': '+6591234567',
+    'email': 'jane.tan@example.com',
+    'best_time': '9am - 1pm',
+    'nature_enquiry': 'London Property Financing',
+}
+
+
+def local_submission_template(server: LocalFormServer) -> SubmissionTemplate:
+    fields = {field: '{{' + field + '}}' for field in SAMPLE_USER_DATA}
+    return SubmissionTemplate(
+        url=server.submit_url,
+        method='POST',
+        headers={'content-type': 'application/json'},
+        body=dict(fields),
+        body_format='json',
+        fields=fields,
+        expected={'status': 200, 'content_type': 'application/json', 'json_keys': ['status']},
+    )
+
+
+async def run_scenario(server, strategy, profile, fills, concurrency, headless=True) -> dict:
+    """Run ``fills`` fills against the local form and return throughput, latency and resource use."""
+    sampler = ProcessTreeSampler()
+    pool = submitter = None
+    work_dir = tempfile.mkdtemp(prefix='bench_')
+
+    if strategy == 'direct':
+        submitter = DirectSubmitter(local_submission_template(server), max_connections=concurrency)
+        await submitter.start()
+
+        async def fill_once():
+            await submitter.submit(SAMPLE_USER_DATA)
+    else:
+        pool = BrowserPool(
+            browsers=1,
+            contexts_per_browser=concurrency,
+            headless=headless,
+            health_check_interval=0,
+            context_options={'viewport': BROWSER_VIEWPORT, 'user_agent': BROWSER_USER_AGENT}
+        )
+        await pool.start()
+        filler = FormFiller(
+            server.url,
+            timing=get_timing_profile(profile),
+            strategy=strategy,
+            screenshots=ScreenshotStore(work_dir, sample_rate=0),
+            schema_cache=FormSchemaCache(os.path.join(work_dir, 'form_schema.json'))
+        )
+
+        async def fill_once():
+            async with pool.page() as page:
+                await filler.fill(page, SAMPLE_USER_DATA)
+
+    latencies = []
+    failures = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed_fill():
+        nonlocal failures
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await fill_once()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                failures += 1
+                logger.error(f"{strategy}/{profile} fill failed: {str(e)}")
+
+    try:
+        # One warm-up fill so browser start-up isn't counted against the strategy
+        await timed_fill()
+        latencies.clear()
+        failures = 0
+
+        sampler.start()
+        cpu_start = sampler.cpu_seconds()
+        started = time.perf_counter()
+        await asyncio.gather(*(timed_fill() for _ in range(fills)))
+        elapsed = time.perf_counter() - started
+        cpu_used = sampler.cpu_seconds() - cpu_start
+        await sampler.stop()
+    finally:
+        if pool:
+            await pool.stop()
+        if submitter:
+            await submitter.stop()
+
+    completed = len(latencies)
+    return {
+        'strategy': strategy,
+        'profile': profile if strategy != 'direct' else None,
+        'fills': fills,
+        'concurrency': concurrency,
+        'failures': failures,
+        'elapsed_seconds': round(elapsed, 3),
+        'fills_per_second': round(completed / elapsed, 3) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'max': round(max(latencies), 1) if latencies else 0.0,
+        },
+        'peak_rss_mb': round(sampler.peak_rss / (1024 * 1024), 1),
+        'cpu_ms_per_fill': round(cpu_used * 1000 / completed, 1) if completed else 0.0,
+    }
+
+
+async def run_benchmarks(args) -> dict:
+    results = []
+    with LocalFormServer(latency_ms=args.latency_ms, asset_kb=args.asset_kb) as server:
+        for strategy in args.strategies:
+            profiles = [None] if strategy == 'direct' else args.profiles
+            for profile in profiles:
+                logger.info(f"Benchmarking strategy={strategy} profile={profile}...")
+                result = await run_scenario(server, strategy, profile, args.fills,
+                                            args.concurrency, headless=not args.headed)
+                logger.info(f"  {result['fills_per_second']} fills/s, p50 {result['latency_ms']['p50']} ms")
+                results.append(result)
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'settings': {
+            'fills': args.fills,
+            'concurrency': args.concurrency,
+            'latency_ms': args.latency_ms,
+            'asset_kb': args.asset_kb,
+        },
+        'results': results,
+    }
+
+
+def print_report(report: dict, baseline: dict = None):
+    previous = {}
+    if baseline:
+        previous = {(r['strategy'], r['profile']): r for r in baseline['results']}
+
+    header = f"{'strategy':<10} {'profile':<8} {'fills/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8} {'CPU ms':>8} {'fail':>5}"
+    print(header)
+    print('-' * len(header))
+    for r in report['results']:
+        print(f"{r['strategy']:<10} {str(r['profile'] or '-'):<8} {r['fills_per_second']:>8} "
+              f"{r['latency_ms']['p50']:>9} {r['latency_ms']['p95']:>9} {r['latency_ms']['p99']:>9} "
+              f"{r['peak_rss_mb']:>8} {r['cpu_ms_per_fill']:>8} {r['failures']:>5}")
+        old = previous.get((r['strategy'], r['profile']))
+        if old:
+            print(f"{'':<10} {'vs base':<8} {r['fills_per_second'] - old['fills_per_second']:>+8.2f} "
+                  f"{r['latency_ms']['p50'] - old['latency_ms']['p50']:>+9.1f} "
+                  f"{r['latency_ms']['p95'] - old['latency_ms']['p95']:>+9.1f} "
+                  f"{r['latency_ms']['p99'] - old['latency_ms']['p99']:>+9.1f} "
+                  f"{r['peak_rss_mb'] - old['peak_rss_mb']:>+8.1f} "
+                  f"{r['cpu_ms_per_fill'] - old['cpu_ms_per_fill']:>+8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark form fill strategies against the local replica form")
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument('--profiles', nargs='+', default=['fast'],
+                        help="timing profiles for browser strategies ('human' takes ~15 s per fill)")
+    parser.add_argument('--fills', type=int, default=20, help="measured fills per scenario")
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--latency-ms', type=int, default=0, help="artificial server latency per request")
+    parser.add_argument('--asset-kb', type=int, default=200, help="size of the padded script asset")
+    parser.add_argument('--headed', action='store_true', help="show the browser windows")
+    parser.add_argument('--output', help="results file (default: bench_results/benchmark_<timestamp>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmarks(args))
+
+    output = Path(args.output or f"bench_results/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -1,21 +1,42 @@
 import asyncio
 import logging
 import re
-from playwright.async_api import async_playwright
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    MessageHandler,
-    CallbackQueryHandler,
-    filters,
-    ConversationHandler,
-    ContextTypes
-)
-from openai import OpenAI
-from config import *
 from pathlib import Path
-import time
+from startup import STARTUP
+
+with STARTUP.phase('import_telegram'):
+    from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+    from telegram.ext import (
+        Application,
+        CommandHandler,
+        MessageHandler,
+        CallbackQueryHandler,
+        filters,
+        ConversationHandler,
+        ContextTypes
+    )
+with STARTUP.phase('import_config'):
+    from config import *
+# Playwright, the OpenAI SDK, aiohttp and the webhook server are imported on
+# first use (or by the background prewarm), not here
+with STARTUP.phase('import_components'):
+    from browser_pool import BrowserPool
+    from browser_workers import BrowserWorkerPool
+    from llm_client import LLMClient
+    from update_processor import PerChatUpdateProcessor
+    from metrics import instrument_handler, timed, StatsCollector, FILL_STAGE_SECONDS, FILLS_TOTAL, FILL_FALLBACKS_TOTAL
+    from prometheus_client import REGISTRY, start_http_server
+    from form_filler import FormFiller
+    from screenshot_store import ScreenshotStore
+    from form_jobs import FormJobQueue, JobStore
+    from governor import BusyError, ResourceBudget
+    from persistence import SQLitePersistence
+    from asset_cache import AssetCache
+    from form_schema import FormSchemaCache
+    from direct_submit import DirectSubmitter, SubmissionTemplate
+    from replay_plan import ReplayPlan, ReplayRunner
+    from resource_policy import ResourcePolicy, DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_DOMAINS
+    from timing_profiles import get_timing_profile
 
 # Configure logging
 logging.basicConfig(
@@ -24,9 +45,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configure OpenAI
-client = OpenAI(api_key=OPENAI_API_KEY)
-
 # Validation patterns
 PHONE_PATTERN = re.compile(r'^\+\d+$')
 EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.com$')
@@ -46,27 +64,194 @@ EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.com$')
 ) = range(10)
 
 class OCBCLoanBot:
-    def __init__(self):
-        self.app = Application.builder().token(TELEGRAM_TOKEN).build()
+    def __init__(self, token=None, llm=None, request=None, persistence=None):
+        self.browser_pool = BrowserPool(
+            browsers=BROWSER_POOL_SIZE,
+            contexts_per_browser=BROWSER_CONTEXTS_PER_BROWSER,
+            max_context_uses=BROWSER_CONTEXT_MAX_USES,
+            headless=BROWSER_HEADLESS,
+            health_check_interval=BROWSER_HEALTH_CHECK_INTERVAL,
+            context_options={'viewport': BROWSER_VIEWPORT, 'user_agent': BROWSER_USER_AGENT}
+        )
+        self.browser_workers = None
+        if FILL_BACKEND == 'workers':
+            self.browser_workers = BrowserWorkerPool(
+                workers=BROWSER_WORKERS,
+                concurrency=BROWSER_WORKER_CONCURRENCY,
+                max_rss_mb=BROWSER_WORKER_MAX_RSS_MB,
+                job_timeout=BROWSER_WORKER_JOB_TIMEOUT,
+                heartbeat_timeout=BROWSER_WORKER_HEARTBEAT_TIMEOUT
+            )
+        self.llm = llm or LLMClient(
+            api_key=OPENAI_API_KEY,
+            model=OPENAI_MODEL,
+            timeout=OPENAI_TIMEOUT,
+            max_connections=OPENAI_MAX_CONNECTIONS
+        )
+        self.resource_policy = None
+        if RESOURCE_POLICY_ENABLED:
+            self.resource_policy = ResourcePolicy(
+                blocked_resource_types=RESOURCE_BLOCKED_TYPES or DEFAULT_BLOCKED_RESOURCE_TYPES,
+                blocked_domains=RESOURCE_BLOCKED_DOMAINS or DEFAULT_BLOCKED_DOMAINS,
+                allowed_resource_types=RESOURCE_ALLOWED_TYPES,
+                allowed_domains=RESOURCE_ALLOWED_DOMAINS
+            )
+        self.direct_submitter = None
+        if DIRECT_SUBMIT_TEMPLATE:
+            self.direct_submitter = DirectSubmitter(
+                SubmissionTemplate.load(DIRECT_SUBMIT_TEMPLATE),
+                timeout=DIRECT_SUBMIT_TIMEOUT,
+                stale_retry_interval=DIRECT_SUBMIT_STALE_RETRY
+            )
+        self.asset_cache = AssetCache(ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES) if ASSET_CACHE_ENABLED else None
+        self.form_schema = FormSchemaCache(FORM_SCHEMA_CACHE) if FORM_SCHEMA_ENABLED else None
+        self.replay = ReplayRunner(ReplayPlan.load(REPLAY_PLAN)) if REPLAY_PLAN else None
+        self.form_filler = FormFiller(
+            OCBC_FORM_URL,
+            timing=get_timing_profile(FILL_TIMING_PROFILE),
+            resource_policy=self.resource_policy,
+            asset_cache=self.asset_cache,
+            schema_cache=self.form_schema,
+            strategy=FILL_STRATEGY,
+            replay=self.replay,
+            screenshots=ScreenshotStore(
+                SCREENSHOT_DIR,
+                sample_rate=SCREENSHOT_SAMPLE_RATE,
+                image_format=SCREENSHOT_FORMAT,
+                quality=SCREENSHOT_QUALITY,
+                mode=SCREENSHOT_MODE,
+                max_files=SCREENSHOT_MAX_FILES,
+                max_bytes=SCREENSHOT_MAX_BYTES
+            )
+        )
+        self.llm_budget = ResourceBudget(
+            'llm',
+            capacity=OPENAI_MAX_CONCURRENCY,
+            max_waiting=LLM_BUDGET_MAX_WAITING,
+            wait_timeout=LLM_BUDGET_WAIT_TIMEOUT,
+            per_user_limit=LLM_BUDGET_PER_USER
+        )
+        self.fill_budget = ResourceBudget(
+            'fill',
+            capacity=FORM_JOB_MAX_CONCURRENT_FILLS,
+            max_waiting=FILL_BUDGET_MAX_WAITING,
+            wait_timeout=FILL_BUDGET_WAIT_TIMEOUT,
+            per_user_limit=FILL_BUDGET_PER_USER
+        )
+        self.form_jobs = FormJobQueue(
+            fill=self.submit_form,
+            notify=self.notify_job,
+            store=JobStore(FORM_JOB_STORE),
+            workers=FORM_JOB_WORKERS,
+            max_attempts=FORM_JOB_MAX_ATTEMPTS,
+            retry_delay=FORM_JOB_RETRY_DELAY,
+            budget=self.fill_budget
+        )
+        self.update_processor = PerChatUpdateProcessor(
+            max_active_updates=MAX_CONCURRENT_UPDATES,
+            max_pending_updates=MAX_PENDING_UPDATES
+        )
+        self.persistence = persistence
+        if self.persistence is None and PERSISTENCE_BACKEND == 'sqlite':
+            self.persistence = SQLitePersistence(
+                PERSISTENCE_DB,
+                owner=REPLICA_ID,
+                shard_index=SHARD_INDEX,
+                shard_count=SHARD_COUNT,
+                update_interval=PERSISTENCE_UPDATE_INTERVAL,
+                flush_interval=PERSISTENCE_FLUSH_INTERVAL,
+                batch_size=PERSISTENCE_BATCH_SIZE,
+                lock_ttl=PERSISTENCE_LOCK_TTL
+            )
+        builder = (
+            Application.builder()
+            .token(token or TELEGRAM_TOKEN)
+            .concurrent_updates(self.update_processor)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+        )
+        if self.persistence:
+            builder.persistence(self.persistence)
+        if request:
+            # Custom Bot API transport, e.g. the load-test harness's local stub
+            builder.request(request)
+        self.app = builder.build()
+        self.stats_collector = StatsCollector(self.stats)
+        self._startup_task = None
         self.setup_handlers()
 
+    async def post_init(self, application: Application):
+        """Start the cheap components; the browser pool and OpenAI client load on first use or in the background."""
+        with STARTUP.phase('post_init'):
+            REGISTRY.register(self.stats_collector)
+            if self.asset_cache:
+                await self.asset_cache.start()
+            if self.form_schema:
+                self.form_schema.load()
+            await self.form_jobs.start()
+        self._startup_task = asyncio.create_task(self.finish_startup(application))
+
+    async def finish_startup(self, application: Application):
+        """Signal readiness once updates are being accepted, then prewarm lazily loaded components."""
+        while not application.running:
+            await asyncio.sleep(0.05)
+        STARTUP.mark_ready()
+        if READY_FILE:
+            Path(READY_FILE).touch()
+        if not PREWARM_ENABLED:
+            return
+        try:
+            with STARTUP.phase('prewarm_llm'):
+                await self.llm.warm()
+            if self.browser_workers:
+                with STARTUP.phase('prewarm_browser_workers'):
+                    await self.browser_workers.start()
+            else:
+                with STARTUP.phase('prewarm_browser_pool'):
+                    await self.browser_pool.start()
+            STARTUP.mark_warm()
+        except Exception as e:
+            logger.error(f"Prewarm failed, components will load on first use: {str(e)}")
+
+    async def post_shutdown(self, application: Application):
+        """Release long-lived resources when the application stops."""
+        REGISTRY.unregister(self.stats_collector)
+        if self._startup_task:
+            self._startup_task.cancel()
+            await asyncio.gather(self._startup_task, return_exceptions=True)
+        if READY_FILE:
+            Path(READY_FILE).unlink(missing_ok=True)
+        await self.form_jobs.stop()
+        await self.browser_pool.stop()
+        if self.browser_workers:
+            await self.browser_workers.stop()
+        if self.direct_submitter:
+            await self.direct_submitter.stop()
+        if self.asset_cache:
+            await self.asset_cache.stop()
+        await self.llm.close()
+
     def setup_handlers(self):
+        instrumented = instrument_handler
+        # Private chats only: persisted user data is sharded by user id, which matches the chat id there
         conv_handler = ConversationHandler(
-            entry_points=[CommandHandler("start", self.start)],
+            entry_points=[CommandHandler("start", instrumented(self.start), filters=filters.ChatType.PRIVATE)],
             states={
-                INITIAL_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.get_initial_name)],
-                INITIAL_QUESTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_initial_question)],
-                ASK_FOR_CONTACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.ask_for_contact)],
-                SALUTATION: [CallbackQueryHandler(self.salutation)],
-                FULL_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.full_name)],
-                CONTACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.contact)],
-                EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.email)],
-                BEST_TIME: [CallbackQueryHandler(self.best_time)],
-                NATURE_ENQUIRY: [CallbackQueryHandler(self.nature_enquiry)],
-                CONFIRM_DETAILS: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.confirm_details)],
+                INITIAL_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.get_initial_name))],
+                INITIAL_QUESTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.handle_initial_question))],
+                ASK_FOR_CONTACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.ask_for_contact))],
+                SALUTATION: [CallbackQueryHandler(instrumented(self.salutation))],
+                FULL_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.full_name))],
+                CONTACT: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.contact))],
+                EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.email))],
+                BEST_TIME: [CallbackQueryHandler(instrumented(self.best_time))],
+                NATURE_ENQUIRY: [CallbackQueryHandler(instrumented(self.nature_enquiry))],
+                CONFIRM_DETAILS: [MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(self.confirm_details))],
             },
-            fallbacks=[CommandHandler("cancel", self.cancel)],
-            per_message=False
+            fallbacks=[CommandHandler("cancel", instrumented(self.cancel))],
+            per_message=False,
+            name='enquiry',
+            persistent=self.persistence is not None
         )
 
         self.app.add_handler(conv_handler)
@@ -90,15 +275,14 @@ class OCBCLoanBot:
         """Handle the user's initial question and offer to connect with a colleague."""
         user_question = update.message.text
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are Kelvin, an OCBC mortgage specialist. Provide helpful and friendly responses about OCBC overseas property loans."},
-                    {"role": "user", "content": user_question}
-                ],
-                temperature=0.7
-            )
-            await update.message.reply_text(response.choices[0].message.content)
+            async with self.llm_budget.slot(update.effective_user.id):
+                answer = await self.llm.complete(
+                    "You are Kelvin, an OCBC mortgage specialist. Provide helpful and friendly responses about OCBC overseas property loans.",
+                    user_question
+                )
+            await update.message.reply_text(answer)
+        except BusyError:
+            await update.message.reply_text(BUSY_MESSAGE)
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             await update.message.reply_text(
@@ -244,169 +428,37 @@ class OCBCLoanBot:
         await query.message.reply_text(confirmation)
         return CONFIRM_DETAILS
 
-    async def submit_form(self, user_data: dict) -> str:
-        """Fill the form using Playwright with human-like behavior based on recorded interactions."""
+    async def submit_form(self, user_data: dict) -> dict:
+        """Submit the enquiry directly over HTTP when possible, otherwise fill the form in a pooled browser page or worker."""
+        if self.direct_submitter and self.direct_submitter.usable:
+            try:
+                with timed(FILL_STAGE_SECONDS, stage='direct_submit'):
+                    url = await self.direct_submitter.submit(user_data)
+                FILLS_TOTAL.labels(outcome='ok', method='direct').inc()
+                return {'url': url, 'method': 'direct'}
+            except Exception as e:
+                logger.warning(f"Direct submission failed, falling back to the browser: {str(e)}")
+                FILL_FALLBACKS_TOTAL.labels(path='direct_to_browser').inc()
+
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                context = await browser.new_context(
-                    viewport={'width': 1280, 'height': 720},
-                    user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
-                )
-                
-                page = await context.new_page()
-                
-                # Enable debug logging
-                page.on("console", lambda msg: logger.info(f"Browser console: {msg.text}"))
-                page.on("pageerror", lambda err: logger.error(f"Browser error: {err}"))
-                
-                # Navigate to the form
-                logger.info("Navigating to form...")
-                await page.goto(OCBC_FORM_URL)
-                
-                # Wait for the page to be fully loaded
-                logger.info("Waiting for page to be fully loaded...")
-                await page.wait_for_load_state("networkidle")
-                await page.wait_for_load_state("domcontentloaded")
-                await page.wait_for_timeout(5000)  # Increased wait time for dynamic content
-                
-                # Wait for form to be ready
-                logger.info("Waiting for form to be ready...")
-                await page.wait_for_selector('form', state='visible', timeout=10000)
-                
-                # Scroll the page slowly to simulate reading
-                logger.info("Scrolling through the page...")
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight/2)")
-                await page.wait_for_timeout(1000)
-                
-                # Select salutation
-                logger.info(f"Selecting salutation: {user_data['salutation']}")
-                try:
-                    # Try to find the radio button by role and label
-                    salutation_radio = f'//input[@type="radio"][@value="{user_data["salutation"]}"]'
-                    await page.wait_for_selector(salutation_radio, timeout=5000)
-                    await page.click(salutation_radio)
-                except Exception as e:
-                    logger.error(f"Failed to select salutation: {str(e)}")
-                    # Try alternative selector
-                    try:
-                        await page.evaluate(f"""
-                            const radios = Array.from(document.querySelectorAll('input[type="radio"]'));
-                            const radio = radios.find(r => r.value === '{user_data["salutation"]}');
-                            if (radio) radio.click();
-                        """)
-                    except Exception as e:
-                        logger.error(f"Alternative salutation selection failed: {str(e)}")
-                
-                await page.wait_for_timeout(1000)
-                
-                # Fill in full name
-                logger.info(f"Entering full name: {user_data['full_name']}")
-                try:
-                    # Try to find the name input by placeholder or label
-                    name_input = '//input[contains(@placeholder, "name") or contains(@aria-label, "name")]'
-                    await page.wait_for_selector(name_input, timeout=5000)
-                    await page.click(name_input)
-                    await page.fill(name_input, "")
-                    await page.type(name_input, user_data['full_name'], delay=100)
-                except Exception as e:
-                    logger.error(f"Failed to enter name: {str(e)}")
-                
-                await page.wait_for_timeout(1000)
-                
-                # Fill in contact number
-                logger.info(f"Entering contact number: {user_data['contact']}")
-                try:
-                    # Try to find the contact input by type or placeholder
-                    contact_input = '//input[@type="tel" or contains(@placeholder, "contact") or contains(@placeholder, "phone")]'
-                    await page.wait_for_selector(contact_input, timeout=5000)
-                    await page.click(contact_input)
-                    await page.fill(contact_input, "")
-                    await page.type(contact_input, user_data['contact'], delay=100)
-                except Exception as e:
-                    logger.error(f"Failed to enter contact: {str(e)}")
-                
-                await page.wait_for_timeout(1000)
-                
-                # Fill in email
-                logger.info(f"Entering email: {user_data['email']}")
-                try:
-                    # Try to find the email input by type or placeholder
-                    email_input = '//input[@type="email" or contains(@placeholder, "email")]'
-                    await page.wait_for_selector(email_input, timeout=5000)
-                    await page.click(email_input)
-                    await page.fill(email_input, "")
-                    await page.type(email_input, user_data['email'], delay=100)
-                except Exception as e:
-                    logger.error(f"Failed to enter email: {str(e)}")
-                
-                await page.wait_for_timeout(1000)
-                
-                # Handle Select2 dropdowns
-                async def handle_select2(field_name: str, value: str):
-                    logger.info(f"Handling {field_name} selection: {value}")
-                    try:
-                        # Find the Select2 container
-                        select_container = f'//label[contains(text(), "{field_name}")]/following::div[contains(@class, "select2-container")]'
-                        await page.wait_for_selector(select_container, timeout=5000)
-                        
-                        # Click to open dropdown
-                        await page.click(select_container)
-                        await page.wait_for_timeout(1000)
-                        
-                        # Try to find and click the option
-                        option = f'//li[contains(@class, "select2-results__option") and contains(text(), "{value}")]'
-                        await page.wait_for_selector(option, timeout=5000)
-                        await page.click(option)
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to select {field_name}: {str(e)}")
-                        try:
-                            # Try alternative method using JavaScript
-                            await page.evaluate("""(fieldName, value) => {
-                                const select = document.querySelector(`select:has(option:contains("${value}"))`);
-                                if (select) {
-                                    const option = Array.from(select.options).find(opt => opt.text.includes(value));
-                                    if (option) {
-                                        select.value = option.value;
-                                        select.dispatchEvent(new Event('change', { bubbles: true }));
-                                        if (window.jQuery) {
-                                            jQuery(select).trigger('change.select2');
-                                        }
-                                    }
-                                }
-                            }""", field_name, value)
-                        except Exception as e:
-                            logger.error(f"Alternative selection for {field_name} failed: {str(e)}")
-                
-                # Select best time to contact
-                await handle_select2("best time", user_data['best_time'])
-                await page.wait_for_timeout(1000)
-                
-                # Select nature of enquiry
-                await handle_select2("nature of enquiry", user_data['nature_enquiry'])
-                await page.wait_for_timeout(1000)
-                
-                # Take a screenshot for verification
-                logger.info("Taking verification screenshot...")
-                screenshots_dir = Path("form_screenshots")
-                screenshots_dir.mkdir(exist_ok=True)
-                screenshot_path = str(screenshots_dir / f"form_filled_{int(time.time())}.png")
-                await page.screenshot(path=screenshot_path)
-                logger.info(f"Screenshot saved to: {screenshot_path}")
-                
-                # Get the current URL with form data
-                filled_url = page.url
-                logger.info(f"Form URL: {filled_url}")
-                
-                # Keep the browser open longer to show the filled form
-                await page.wait_for_timeout(10000)
-                
-                await browser.close()
-                return filled_url
+            with timed(FILL_STAGE_SECONDS, stage='total'):
+                if self.browser_workers:
+                    # Chromium runs in a worker process; stage metrics stay in that process
+                    url = await self.browser_workers.fill(user_data)
+                else:
+                    # A timeout ends the lease with an error, so the pool recycles the hung context
+                    async with self.browser_pool.page() as page:
+                        url = await asyncio.wait_for(self.form_filler.fill(page, user_data), FILL_TIMEOUT)
+            FILLS_TOTAL.labels(outcome='ok', method='browser').inc()
+            return {'url': url, 'method': 'browser'}
 
+        except asyncio.TimeoutError:
+            logger.error(f"Form filling timed out after {FILL_TIMEOUT:g}s")
+            FILLS_TOTAL.labels(outcome='failed', method='browser').inc()
+            return None
         except Exception as e:
             logger.error(f"Form filling error: {str(e)}")
+            FILLS_TOTAL.labels(outcome='failed', method='browser').inc()
             return None
 
     async def confirm_details(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -414,21 +466,14 @@ class OCBCLoanBot:
         user_response = update.message.text.lower()
         
         if user_response == 'submit':
-            # Fill form and get pre-filled URL
-            prefilled_url = await self.submit_form(context.user_data)
-            
-            if prefilled_url:
-                await update.message.reply_text(
-                    "✅ Great! I've prepared your form submission.\n\n"
-                    f"🔗 Click here to review and submit your details:\n{prefilled_url}\n\n"
-                    "The form has been pre-filled with your information. Please review and submit it on the OCBC website.\n\n"
-                    "Feel free to ask me any questions about OCBC overseas property loans! 💬"
-                )
-            else:
-                await update.message.reply_text(
-                    "I apologize, but I'm having trouble accessing the form. "
-                    "Please try again or contact OCBC directly at +65 6363 3333."
-                )
+            # Queue the form fill; progress is pushed to the chat by notify_job
+            form_data = {field: context.user_data[field] for field in FORM_FIELDS}
+            try:
+                await self.form_jobs.submit(update.effective_chat.id, form_data)
+            except BusyError:
+                # Keep the details so the user can just type 'submit' again
+                await update.message.reply_text(BUSY_MESSAGE)
+                return CONFIRM_DETAILS
             return ConversationHandler.END
             
         elif user_response == 'edit':
@@ -454,6 +499,41 @@ class OCBCLoanBot:
             )
             return CONFIRM_DETAILS
 
+    async def notify_job(self, job, event: str):
+        """Push form job progress to the user's chat."""
+        if event == 'queued':
+            text = (
+                "📥 Got it! Your enquiry is queued and I'm preparing your form now.\n"
+                "I'll message you here as soon as it's ready."
+            )
+        elif event == 'started':
+            if job.attempts > 1:
+                return
+            text = "⏳ Filling in your form on the OCBC website..."
+        elif event == 'busy':
+            text = BUSY_MESSAGE + "Your details weren't sent, just type /start to begin again."
+        elif event == 'retrying':
+            text = "🔄 The OCBC website is being slow, I'm trying again..."
+        elif event == 'succeeded' and job.method == 'direct':
+            text = (
+                "✅ Great! Your enquiry has been submitted to OCBC.\n\n"
+                "Our property loan specialist will contact you soon.\n\n"
+                "Feel free to ask me any questions about OCBC overseas property loans! 💬"
+            )
+        elif event == 'succeeded':
+            text = (
+                "✅ Great! I've prepared your form submission.\n\n"
+                f"🔗 Click here to review and submit your details:\n{job.result_url}\n\n"
+                "The form has been pre-filled with your information. Please review and submit it on the OCBC website.\n\n"
+                "Feel free to ask me any questions about OCBC overseas property loans! 💬"
+            )
+        else:
+            text = (
+                "I apologize, but I'm having trouble accessing the form. "
+                "Please try again or contact OCBC directly at +65 6363 3333."
+            )
+        await self.app.bot.send_message(chat_id=job.chat_id, text=text)
+
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Cancel the conversation."""
         await update.message.reply_text(
@@ -464,15 +544,14 @@ class OCBCLoanBot:
     async def handle_question(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle user questions using GPT-4."""
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant specializing in OCBC overseas property loans. Provide clear, accurate, and friendly responses."},
-                    {"role": "user", "content": update.message.text}
-                ],
-                temperature=0.7
-            )
-            await update.message.reply_text(response.choices[0].message.content)
+            async with self.llm_budget.slot(update.effective_user.id):
+                answer = await self.llm.complete(
+                    "You are a helpful assistant specializing in OCBC overseas property loans. Provide clear, accurate, and friendly responses.",
+                    update.message.text
+                )
+            await update.message.reply_text(answer)
+        except BusyError:
+            await update.message.reply_text(BUSY_MESSAGE)
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             await update.message.reply_text(
@@ -480,10 +559,55 @@ class OCBCLoanBot:
                 "Please try again later or contact OCBC directly for immediate assistance."
             )
 
+    def stats(self) -> dict:
+        """Snapshot of the bot's runtime components for health and monitoring."""
+        stats = {
+            'updates': self.update_processor.stats(),
+            'browser_pool': self.browser_pool.stats(),
+            'form_jobs': self.form_jobs.stats(),
+            'llm_budget': self.llm_budget.stats(),
+            'fill_budget': self.fill_budget.stats(),
+            'startup': STARTUP.stats(),
+        }
+        if self.resource_policy:
+            stats['resource_policy'] = self.resource_policy.stats()
+        if self.asset_cache:
+            stats['asset_cache'] = self.asset_cache.stats()
+        if self.direct_submitter:
+            stats['direct_submit'] = self.direct_submitter.stats()
+        if self.form_schema:
+            stats['form_schema'] = self.form_schema.stats()
+        if self.replay:
+            stats['replay'] = self.replay.stats()
+        if self.browser_workers:
+            stats['browser_workers'] = self.browser_workers.stats()
+        if self.persistence:
+            stats['persistence'] = self.persistence.stats()
+        return stats
+
     def run(self):
-        """Run the bot."""
-        self.app.run_polling()
+        """Run the bot with polling or as a webhook server, depending on BOT_MODE."""
+        if SHARD_COUNT > 1:
+            if BOT_MODE != 'webhook' or len(SHARD_PEERS) != SHARD_COUNT or not 0 <= SHARD_INDEX < SHARD_COUNT:
+                raise ValueError("Sharding needs BOT_MODE=webhook, SHARD_INDEX below SHARD_COUNT "
+                                 "and one SHARD_PEERS URL per shard")
+            if self.persistence is None:
+                logger.warning("Sharded without persistence: conversations are lost when a replica restarts")
+        if BOT_MODE == 'webhook':
+            if not WEBHOOK_URL or not WEBHOOK_SECRET_TOKEN:
+                raise ValueError("WEBHOOK_URL and WEBHOOK_SECRET_TOKEN must be set in webhook mode")
+            with STARTUP.phase('import_webhook_server'):
+                import uvicorn
+                from webhook_server import create_webhook_app
+            api = create_webhook_app(self, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN,
+                                     shard_index=SHARD_INDEX, shard_count=SHARD_COUNT, shard_peers=SHARD_PEERS)
+            uvicorn.run(api, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+        else:
+            if METRICS_PORT:
+                start_http_server(METRICS_PORT, addr=METRICS_HOST)
+            self.app.run_polling()
 
 if __name__ == "__main__":
-    bot = OCBCLoanBot()
+    with STARTUP.phase('init_bot'):
+        bot = OCBCLoanBot()
     bot.run() 
\ No newline at end of file
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from metrics import timed, FILL_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _ContextSlot:
+    """One leasable browser context inside the pool."""
+
+    def __init__(self, browser_index: int):
+        self.browser_index = browser_index
+        self.context = None
+        self.generation = -1
+        self.uses = 0
+
+
+class BrowserPool:
+    """Long-lived pool of Chromium browsers that leases out pages for form fills.
+
+    Each browser owns a fixed number of context slots. A lease hands out a fresh
+    page in an idle context; the context is recycled after ``max_context_uses``
+    leases or as soon as a lease ends with an error.
+    """
+
+    def __init__(self, browsers=1, contexts_per_browser=2, max_context_uses=20,
+                 headless=False, health_check_interval=30.0, context_options=None):
+        self.browsers = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.max_context_uses = max_context_uses
+        self.headless = headless
+        self.health_check_interval = health_check_interval
+        self.context_options = context_options or {}
+
+        self._playwright = None
+        self._browsers = []
+        self._generations = []
+        self._browser_locks = []
+        self._idle = None
+        self._health_task = None
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._waiting = 0
+
+        self.leases = 0
+        self.recycled_contexts = 0
+        self.relaunched_browsers = 0
+
+    async def start(self):
+        """Launch Playwright, the browsers and the (lazily created) context slots.
+
+        Safe to call concurrently: the first caller starts the pool and the
+        others wait for it.
+        """
+        async with self._start_lock:
+            if self._started:
+                return
+            from playwright.async_api import async_playwright
+            logger.info(f"Starting browser pool: {self.browsers} browser(s) x {self.contexts_per_browser} context(s)")
+            self._playwright = await async_playwright().start()
+            self._idle = asyncio.Queue()
+            try:
+                for index in range(self.browsers):
+                    self._browsers.append(await self._launch_browser())
+                    self._generations.append(0)
+                    self._browser_locks.append(asyncio.Lock())
+                    for _ in range(self.contexts_per_browser):
+                        self._idle.put_nowait(_ContextSlot(index))
+            except Exception as e:
+                # Undo the partial start so a retry doesn't leak these browsers and Playwright
+                logger.error(f"Error starting browser pool: {str(e)}")
+                await self._close_browsers()
+                await self._playwright.stop()
+                self._playwright = None
+                self._idle = None
+                raise
+            self._started = True
+            if self.health_check_interval:
+                self._health_task = asyncio.create_task(self._health_check_loop())
+
+    async def stop(self):
+        """Close every context and browser and stop Playwright."""
+        if not self._started:
+            return
+        logger.info("Stopping browser pool...")
+        self._started = False
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        while not self._idle.empty():
+            await self._close_context(self._idle.get_nowait())
+        # Wake leases still waiting for a slot; they fail instead of hanging
+        for _ in range(self._waiting):
+            self._idle.put_nowait(None)
+        await self._close_browsers()
+        await self._playwright.stop()
+        self._playwright = None
+
+    async def _close_browsers(self):
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.error(f"Error closing browser: {str(e)}")
+        self._browsers.clear()
+        self._generations.clear()
+        self._browser_locks.clear()
+
+    @asynccontextmanager
+    async def page(self):
+        """Lease a new page in a pooled context for the duration of the block.
+
+        Starts the pool on first use if it hasn't been started yet.
+        """
+        if not self._started:
+            await self.start()
+
+        self._waiting += 1
+        try:
+            slot = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        if slot is None:
+            raise RuntimeError("Browser pool stopped while waiting for a page")
+        page = None
+        failed = False
+        try:
+            with timed(FILL_STAGE_SECONDS, stage='launch'):
+                await self._ensure_context(slot)
+                page = await slot.context.new_page()
+            slot.uses += 1
+            self.leases += 1
+            yield page
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with timed(FILL_STAGE_SECONDS, stage='close'):
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logger.error(f"Error closing leased page: {str(e)}")
+                        failed = True
+                if failed or slot.uses >= self.max_context_uses:
+                    await self._close_context(slot)
+                    self.recycled_contexts += 1
+            if self._started:
+                self._idle.put_nowait(slot)
+            else:
+                await self._close_context(slot)
+
+    def stats(self) -> dict:
+        """Return a snapshot of pool occupancy and lifecycle counters."""
+        capacity = self.browsers * self.contexts_per_browser
+        idle = self._idle.qsize() if self._idle else 0
+        return {
+            'capacity': capacity,
+            'idle': idle,
+            'leased': capacity - idle if self._started else 0,
+            'leases': self.leases,
+            'recycled_contexts': self.recycled_contexts,
+            'relaunched_browsers': self.relaunched_browsers,
+        }
+
+    async def _launch_browser(self):
+        return await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _ensure_context(self, slot: _ContextSlot):
+        """Make sure the slot has a live context on a connected browser."""
+        await self._ensure_browser(slot.browser_index)
+        if slot.context is not None and slot.generation != self._generations[slot.browser_index]:
+            # The browser was relaunched since this context was created
+            slot.context = None
+        if slot.context is None:
+            browser = self._browsers[slot.browser_index]
+            slot.context = await browser.new_context(**self.context_options)
+            slot.generation = self._generations[slot.browser_index]
+            slot.uses = 0
+
+    async def _ensure_browser(self, index: int):
+        """Relaunch the browser at ``index`` if it has disconnected."""
+        async with self._browser_locks[index]:
+            if self._browsers[index].is_connected():
+                return
+            logger.warning(f"Browser {index} disconnected, relaunching...")
+            self._browsers[index] = await self._launch_browser()
+            self._generations[index] += 1
+            self.relaunched_browsers += 1
+
+    async def _close_context(self, slot: _ContextSlot):
+        if slot.context is None:
+            return
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logger.error(f"Error closing browser context: {str(e)}")
+        slot.context = None
+        slot.uses = 0
+
+    async def _health_check_loop(self):
+        """Periodically relaunch dead browsers so leases don't pay for it."""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for index in range(len(self._browsers)):
+                try:
+                    await self._ensure_browser(index)
+                except Exception as e:
+                    logger.error(f"Browser {index} health check failed: {str(e)}")
@@ -0,0 +1,357 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from proc_stats import ProcessTreeSampler
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerFillError(Exception):
+    """A fill failed inside a browser worker, or the worker died while running it."""
+
+
+async def default_components(worker_id: int, concurrency: int):
+    """Browser pool and form filler for one worker process, configured like the bot's in-process ones.
+
+    Returns ``(browser_pool, form_filler, close)``. Each worker keeps its asset
+    cache in its own subdirectory so workers never write the same index.
+    """
+    from config import (
+        BROWSER_CONTEXT_MAX_USES, BROWSER_HEADLESS, BROWSER_HEALTH_CHECK_INTERVAL, BROWSER_VIEWPORT,
+        BROWSER_USER_AGENT, RESOURCE_POLICY_ENABLED, RESOURCE_BLOCKED_TYPES, RESOURCE_BLOCKED_DOMAINS,
+        RESOURCE_ALLOWED_TYPES, RESOURCE_ALLOWED_DOMAINS, ASSET_CACHE_ENABLED, ASSET_CACHE_DIR,
+        ASSET_CACHE_MAX_BYTES, FORM_SCHEMA_ENABLED, FORM_SCHEMA_CACHE, OCBC_FORM_URL, FILL_TIMING_PROFILE,
+        FILL_STRATEGY, REPLAY_PLAN, SCREENSHOT_DIR, SCREENSHOT_SAMPLE_RATE, SCREENSHOT_FORMAT,
+        SCREENSHOT_QUALITY, SCREENSHOT_MODE, SCREENSHOT_MAX_FILES, SCREENSHOT_MAX_BYTES
+    )
+    from asset_cache import AssetCache
+    from browser_pool import BrowserPool
+    from form_filler import FormFiller
+    from form_schema import FormSchemaCache
+    from replay_plan import ReplayPlan, ReplayRunner
+    from resource_policy import ResourcePolicy, DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_DOMAINS
+    from screenshot_store import ScreenshotStore
+    from timing_profiles import get_timing_profile
+
+    browser_pool = BrowserPool(
+        browsers=1,
+        contexts_per_browser=concurrency,
+        max_context_uses=BROWSER_CONTEXT_MAX_USES,
+        headless=BROWSER_HEADLESS,
+        health_check_interval=BROWSER_HEALTH_CHECK_INTERVAL,
+        context_options={'viewport': BROWSER_VIEWPORT, 'user_agent': BROWSER_USER_AGENT}
+    )
+    resource_policy = None
+    if RESOURCE_POLICY_ENABLED:
+        resource_policy = ResourcePolicy(
+            blocked_resource_types=RESOURCE_BLOCKED_TYPES or DEFAULT_BLOCKED_RESOURCE_TYPES,
+            blocked_domains=RESOURCE_BLOCKED_DOMAINS or DEFAULT_BLOCKED_DOMAINS,
+            allowed_resource_types=RESOURCE_ALLOWED_TYPES,
+            allowed_domains=RESOURCE_ALLOWED_DOMAINS
+        )
+    asset_cache = None
+    if ASSET_CACHE_ENABLED:
+        asset_cache = AssetCache(Path(ASSET_CACHE_DIR) / f"worker-{worker_id}", max_bytes=ASSET_CACHE_MAX_BYTES)
+        await asset_cache.start()
+    form_schema = None
+    if FORM_SCHEMA_ENABLED:
+        form_schema = FormSchemaCache(FORM_SCHEMA_CACHE)
+        form_schema.load()
+    form_filler = FormFiller(
+        OCBC_FORM_URL,
+        timing=get_timing_profile(FILL_TIMING_PROFILE),
+        resource_policy=resource_policy,
+        asset_cache=asset_cache,
+        schema_cache=form_schema,
+        strategy=FILL_STRATEGY,
+        replay=ReplayRunner(ReplayPlan.load(REPLAY_PLAN)) if REPLAY_PLAN else None,
+        screenshots=ScreenshotStore(
+            SCREENSHOT_DIR,
+            sample_rate=SCREENSHOT_SAMPLE_RATE,
+            image_format=SCREENSHOT_FORMAT,
+            quality=SCREENSHOT_QUALITY,
+            mode=SCREENSHOT_MODE,
+            max_files=SCREENSHOT_MAX_FILES,
+            max_bytes=SCREENSHOT_MAX_BYTES
+        )
+    )
+
+    async def close():
+        await browser_pool.stop()
+        if asset_cache:
+            await asset_cache.stop()
+
+    return browser_pool, form_filler, close
+
+
+def _worker_main(worker_id, jobs, results, concurrency, factory, heartbeat_interval):
+    # Own process group, so killing the worker also takes down its Playwright driver and Chromium
+    os.setpgrp()
+    logging.basicConfig(
+        format=f'%(asctime)s - worker-{worker_id} - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    try:
+        asyncio.run(_serve(worker_id, jobs, results, concurrency, factory, heartbeat_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve(worker_id, jobs, results, concurrency, factory, heartbeat_interval):
+    """Worker process loop: run fill jobs from ``jobs`` and report results and heartbeats on ``results``."""
+    pid = os.getpid()
+    sampler = ProcessTreeSampler()
+    running = set()
+
+    async def heartbeat():
+        while True:
+            rss = await asyncio.to_thread(sampler.rss_bytes)
+            results.put(('heartbeat', worker_id, pid, {'rss': rss, 'active': len(running)}))
+            await asyncio.sleep(heartbeat_interval)
+
+    # Heartbeats start before Chromium so a slow launch isn't mistaken for a hang
+    heartbeat_task = asyncio.create_task(heartbeat())
+    browser_pool, form_filler, close = await factory(worker_id, concurrency)
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        logger.error(f"Error starting the browser pool, it will start on the first fill: {str(e)}")
+
+    async def run(job_id, user_data):
+        try:
+            async with browser_pool.page() as page:
+                url = await form_filler.fill(page, user_data)
+            results.put(('result', worker_id, pid, job_id, {'ok': True, 'url': url}))
+        except Exception as e:
+            logger.error(f"Form filling error: {str(e)}")
+            results.put(('result', worker_id, pid, job_id, {'ok': False, 'error': f"{type(e).__name__}: {e}"}))
+
+    while True:
+        job = await asyncio.to_thread(jobs.get)
+        if job is None:
+            break
+        task = asyncio.create_task(run(*job))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    await asyncio.gather(*running, return_exceptions=True)
+    heartbeat_task.cancel()
+    await close()
+
+
+class _Worker:
+    def __init__(self, worker_id: int):
+        self.id = worker_id
+        self.process = None
+        self.jobs = None
+        self.pid = None
+        self.in_flight = {}
+        self.rss = 0
+        self.last_heartbeat = 0.0
+        self.draining = False
+        self.completed = 0
+        self.failed = 0
+
+
+class BrowserWorkerPool:
+    """Runs form fills in separate worker processes, each with its own Playwright and Chromium.
+
+    Jobs go to the least busy worker over its own IPC queue, at most
+    ``concurrency`` per worker; results and heartbeats come back on a shared
+    queue read by a thread, so the bot's event loop never drives a browser.
+
+    A watchdog restarts a worker when its process exits, when it misses
+    heartbeats for ``heartbeat_timeout`` seconds or a job runs past
+    ``job_timeout`` (the worker is killed and its jobs fail), and when its
+    process tree grows past ``max_rss_mb`` (it is drained first).
+    """
+
+    def __init__(self, workers=2, concurrency=2, max_rss_mb=1024, job_timeout=180.0,
+                 heartbeat_interval=5.0, heartbeat_timeout=30.0, factory=default_components):
+        self.concurrency = concurrency
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.job_timeout = job_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.factory = factory
+        self.workers = [_Worker(i) for i in range(workers)]
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._results = None
+        self._reader = None
+        self._watchdog = None
+        self._loop = None
+        self._changed = None
+        self._job_ids = itertools.count(1)
+        self._start_lock = asyncio.Lock()
+        self.restarts = {}
+
+    async def start(self):
+        async with self._start_lock:
+            if self._watchdog is not None:
+                return
+            self._loop = asyncio.get_running_loop()
+            self._changed = asyncio.Event()
+            self._results = self._ctx.Queue()
+            self._reader = threading.Thread(target=self._read_results, name="browser-worker-results", daemon=True)
+            self._reader.start()
+            for worker in self.workers:
+                await asyncio.to_thread(self._spawn, worker)
+            self._watchdog = asyncio.create_task(self._watch())
+            logger.info(f"Started {len(self.workers)} browser worker(s)")
+
+    async def stop(self):
+        if self._watchdog is None:
+            return
+        self._watchdog.cancel()
+        await asyncio.gather(self._watchdog, return_exceptions=True)
+        self._watchdog = None
+        await asyncio.gather(*(self._shutdown(worker, kill=False) for worker in self.workers))
+        for worker in self.workers:
+            self._fail_in_flight(worker, "browser workers stopped")
+        self._results.put(None)
+        await asyncio.to_thread(self._reader.join, 5)
+
+    async def fill(self, user_data: dict) -> str:
+        """Fill the form in a worker and return the resulting page URL.
+
+        Raises :class:`WorkerFillError` if the fill fails or its worker dies.
+        """
+        await self.start()
+        while (worker := self._pick()) is None:
+            self._changed.clear()
+            await self._changed.wait()
+
+        job_id = next(self._job_ids)
+        future = self._loop.create_future()
+        worker.in_flight[job_id] = (future, time.monotonic())
+        worker.jobs.put((job_id, user_data))
+        result = await future
+        if not result['ok']:
+            raise WorkerFillError(result['error'])
+        return result['url']
+
+    def _pick(self):
+        available = [w for w in self.workers
+                     if not w.draining and w.process and w.process.is_alive() and len(w.in_flight) < self.concurrency]
+        return min(available, key=lambda w: len(w.in_flight), default=None)
+
+    def _spawn(self, worker: _Worker):
+        worker.jobs = self._ctx.Queue()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.id, worker.jobs, self._results, self.concurrency, self.factory, self.heartbeat_interval),
+            name=f"browser-worker-{worker.id}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.pid = worker.process.pid
+        worker.rss = 0
+        worker.draining = False
+        worker.last_heartbeat = time.monotonic()
+
+    def _read_results(self):
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            self._loop.call_soon_threadsafe(self._handle, message)
+
+    def _handle(self, message):
+        kind, worker_id, pid = message[:3]
+        worker = self.workers[worker_id]
+        if pid != worker.pid:
+            # Late message from a process that has since been replaced
+            return
+        if kind == 'heartbeat':
+            worker.last_heartbeat = time.monotonic()
+            worker.rss = message[3]['rss']
+            return
+
+        job_id, result = message[3], message[4]
+        future, _ = worker.in_flight.pop(job_id, (None, None))
+        if result['ok']:
+            worker.completed += 1
+        else:
+            worker.failed += 1
+        if future and not future.done():
+            future.set_result(result)
+        self._changed.set()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for worker in self.workers:
+                try:
+                    await self._check(worker)
+                except Exception as e:
+                    logger.error(f"Error checking browser worker {worker.id}: {str(e)}")
+
+    async def _check(self, worker: _Worker):
+        now = time.monotonic()
+        reason = None
+        if not worker.process.is_alive():
+            reason = 'exited'
+        elif now - worker.last_heartbeat > self.heartbeat_timeout:
+            reason = 'unresponsive'
+        elif any(now - started > self.job_timeout for _, started in worker.in_flight.values()):
+            reason = 'job_timeout'
+        if reason:
+            logger.error(f"Browser worker {worker.id} {reason}, restarting it")
+            await self._restart(worker, reason, kill=True)
+            return
+
+        if worker.rss > self.max_rss_bytes and not worker.draining:
+            logger.warning(f"Browser worker {worker.id} uses {worker.rss // (1024 * 1024)} MB, "
+                           f"draining it for a restart")
+            worker.draining = True
+        if worker.draining and not worker.in_flight:
+            await self._restart(worker, 'memory', kill=False)
+
+    async def _restart(self, worker: _Worker, reason: str, kill: bool):
+        await self._shutdown(worker, kill)
+        self._fail_in_flight(worker, f"browser worker {reason}")
+        self.restarts[reason] = self.restarts.get(reason, 0) + 1
+        await asyncio.to_thread(self._spawn, worker)
+        self._changed.set()
+
+    async def _shutdown(self, worker: _Worker, kill: bool):
+        process = worker.process
+        if process is None:
+            return
+        if not kill and process.is_alive():
+            worker.jobs.put(None)
+            await asyncio.to_thread(process.join, 30)
+        if process.is_alive():
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                process.kill()
+            await asyncio.to_thread(process.join, 5)
+
+    def _fail_in_flight(self, worker: _Worker, reason: str):
+        for future, _ in worker.in_flight.values():
+            if not future.done():
+                future.set_result({'ok': False, 'error': reason})
+        worker.failed += len(worker.in_flight)
+        worker.in_flight.clear()
+
+    def stats(self) -> dict:
+        return {
+            'workers': len(self.workers),
+            'alive': sum(1 for w in self.workers if w.process and w.process.is_alive()),
+            'in_flight': sum(len(w.in_flight) for w in self.workers),
+            'completed': sum(w.completed for w in self.workers),
+            'failed': sum(w.failed for w in self.workers),
+            'rss_mb': {str(w.id): round(w.rss / (1024 * 1024), 1) for w in self.workers},
+            'restarts': dict(self.restarts),
+        }
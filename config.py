@@ -9,10 +9,143 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o')
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))
+# Capacity of the LLM admission budget: completions in flight at once across all chats
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '8'))
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))
 
 # Form URL
 OCBC_FORM_URL = "https://www.ocbc.com/personal-banking/forms/overseas-property-loan-enquiry"
 
+# Serving Mode
+# 'polling' (default) or 'webhook' (FastAPI/uvicorn server receiving Telegram updates)
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Public base URL, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+
+# Startup
+# Load Playwright/Chromium and the OpenAI client in the background once the bot
+# is accepting updates; when disabled they load on first use
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', 'true').lower() == 'true'
+READY_FILE = os.getenv('READY_FILE')  # touched once updates are accepted, e.g. for exec probes
+
+# Prometheus metrics port in polling mode, 0 = off (webhook mode serves /metrics on the webhook server).
+# The listener is unauthenticated, so it binds to localhost unless METRICS_HOST says otherwise.
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Update Processing
+# Updates from different chats run in parallel up to this limit; each chat stays ordered.
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '32'))
+MAX_PENDING_UPDATES = int(os.getenv('MAX_PENDING_UPDATES', '1024'))
+
+# Browser Pool
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '1'))
+BROWSER_CONTEXTS_PER_BROWSER = int(os.getenv('BROWSER_CONTEXTS_PER_BROWSER', '2'))
+BROWSER_CONTEXT_MAX_USES = int(os.getenv('BROWSER_CONTEXT_MAX_USES', '20'))
+BROWSER_HEALTH_CHECK_INTERVAL = float(os.getenv('BROWSER_HEALTH_CHECK_INTERVAL', '30'))
+BROWSER_HEADLESS = os.getenv('BROWSER_HEADLESS', 'false').lower() == 'true'
+BROWSER_VIEWPORT = {'width': 1280, 'height': 720}
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+
+# Persistence
+# 'sqlite' keeps conversation states and user data in PERSISTENCE_DB so they
+# survive restarts and can be shared by replicas; 'none' keeps them in memory
+PERSISTENCE_BACKEND = os.getenv('PERSISTENCE_BACKEND', 'sqlite')
+PERSISTENCE_DB = os.getenv('PERSISTENCE_DB', 'bot_state.db')
+# How often the application hands changed data to the persistence, and how often it is written
+PERSISTENCE_UPDATE_INTERVAL = float(os.getenv('PERSISTENCE_UPDATE_INTERVAL', '2'))
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv('PERSISTENCE_FLUSH_INTERVAL', '0.5'))
+PERSISTENCE_BATCH_SIZE = int(os.getenv('PERSISTENCE_BATCH_SIZE', '500'))
+# How long a replica's lease on a chat outlives its last write (default: three update cycles)
+PERSISTENCE_LOCK_TTL = float(os.getenv('PERSISTENCE_LOCK_TTL', '0')) or None
+
+# Sharding
+# Chats are split across SHARD_COUNT replicas by chat_id % SHARD_COUNT (webhook mode only).
+# SHARD_PEERS lists each shard's internal base URL, in shard order, for forwarding updates.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '1'))
+SHARD_INDEX = int(os.getenv('SHARD_INDEX', '0'))
+SHARD_PEERS = [u.strip().rstrip('/') for u in os.getenv('SHARD_PEERS', '').split(',') if u.strip()]
+REPLICA_ID = os.getenv('REPLICA_ID', f'shard-{SHARD_INDEX}')
+
+# Browser Workers
+# 'inprocess' drives Chromium on the bot's event loop; 'workers' hands fills to
+# separate processes, each with its own Playwright, Chromium and filler
+FILL_BACKEND = os.getenv('FILL_BACKEND', 'inprocess')
+BROWSER_WORKERS = int(os.getenv('BROWSER_WORKERS', '2'))
+BROWSER_WORKER_CONCURRENCY = int(os.getenv('BROWSER_WORKER_CONCURRENCY', '2'))
+# A worker whose process tree (Chromium included) grows past this is drained and restarted
+BROWSER_WORKER_MAX_RSS_MB = int(os.getenv('BROWSER_WORKER_MAX_RSS_MB', '1024'))
+BROWSER_WORKER_JOB_TIMEOUT = float(os.getenv('BROWSER_WORKER_JOB_TIMEOUT', '180'))
+BROWSER_WORKER_HEARTBEAT_TIMEOUT = float(os.getenv('BROWSER_WORKER_HEARTBEAT_TIMEOUT', '30'))
+
+# Resource Policy
+# Comma-separated lists; unset blocked lists keep the defaults in resource_policy.py
+RESOURCE_POLICY_ENABLED = os.getenv('RESOURCE_POLICY_ENABLED', 'true').lower() == 'true'
+RESOURCE_BLOCKED_TYPES = [t.strip() for t in os.getenv('RESOURCE_BLOCKED_TYPES', '').split(',') if t.strip()]
+RESOURCE_BLOCKED_DOMAINS = [d.strip() for d in os.getenv('RESOURCE_BLOCKED_DOMAINS', '').split(',') if d.strip()]
+RESOURCE_ALLOWED_TYPES = [t.strip() for t in os.getenv('RESOURCE_ALLOWED_TYPES', '').split(',') if t.strip()]
+RESOURCE_ALLOWED_DOMAINS = [d.strip() for d in os.getenv('RESOURCE_ALLOWED_DOMAINS', '').split(',') if d.strip()]
+
+# Asset Cache
+# Static JS/CSS/font/image responses of the form page, shared across fills
+ASSET_CACHE_ENABLED = os.getenv('ASSET_CACHE_ENABLED', 'true').lower() == 'true'
+ASSET_CACHE_DIR = os.getenv('ASSET_CACHE_DIR', 'asset_cache')
+ASSET_CACHE_MAX_BYTES = int(os.getenv('ASSET_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+# Direct Submission
+# JSON template built with `python direct_submit.py`; unset disables browserless submission
+DIRECT_SUBMIT_TEMPLATE = os.getenv('DIRECT_SUBMIT_TEMPLATE')
+DIRECT_SUBMIT_TIMEOUT = float(os.getenv('DIRECT_SUBMIT_TIMEOUT', '10'))
+DIRECT_SUBMIT_STALE_RETRY = float(os.getenv('DIRECT_SUBMIT_STALE_RETRY', '600'))
+
+# Form Filling
+# 'human' keeps the original human-like pacing, 'fast' waits on readiness signals only.
+# A path to a JSON timing profile can also be given.
+FILL_TIMING_PROFILE = os.getenv('FILL_TIMING_PROFILE', 'human')
+# 'stepwise' fills field by field; 'batch' sets all fields in one in-page script
+FILL_STRATEGY = os.getenv('FILL_STRATEGY', 'stepwise')
+# Plan compiled with `python replay_plan.py compile`; when set it replaces the fill strategy
+REPLAY_PLAN = os.getenv('REPLAY_PLAN')
+# Deadline for one in-process fill; a page that hangs past it is abandoned and its context recycled
+FILL_TIMEOUT = float(os.getenv('FILL_TIMEOUT', '120'))
+
+# Verification Screenshots
+# Taken on mismatch, on error, and for this fraction of successful fills
+SCREENSHOT_DIR = os.getenv('SCREENSHOT_DIR', 'fill_screenshots')
+SCREENSHOT_SAMPLE_RATE = float(os.getenv('SCREENSHOT_SAMPLE_RATE', '0.05'))
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'jpeg')  # 'jpeg' or 'png'
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', '70'))
+SCREENSHOT_MODE = os.getenv('SCREENSHOT_MODE', 'form')  # 'form', 'viewport' or 'full_page'
+SCREENSHOT_MAX_FILES = int(os.getenv('SCREENSHOT_MAX_FILES', '200'))
+SCREENSHOT_MAX_BYTES = int(os.getenv('SCREENSHOT_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Form Schema
+# Field-to-selector index extracted from the live form, re-extracted when its fingerprint changes
+FORM_SCHEMA_ENABLED = os.getenv('FORM_SCHEMA_ENABLED', 'true').lower() == 'true'
+FORM_SCHEMA_CACHE = os.getenv('FORM_SCHEMA_CACHE', 'form_schema.json')
+
+# Form Jobs
+FORM_JOB_STORE = os.getenv('FORM_JOB_STORE', 'form_jobs.json')
+FORM_JOB_WORKERS = int(os.getenv('FORM_JOB_WORKERS', '2'))
+FORM_JOB_MAX_CONCURRENT_FILLS = int(os.getenv('FORM_JOB_MAX_CONCURRENT_FILLS', '2'))
+FORM_JOB_MAX_ATTEMPTS = int(os.getenv('FORM_JOB_MAX_ATTEMPTS', '3'))
+FORM_JOB_RETRY_DELAY = float(os.getenv('FORM_JOB_RETRY_DELAY', '5'))
+
+# Admission Control
+# Work beyond a budget's concurrency waits in a bounded queue; anything past
+# that, or waiting longer than the timeout, gets BUSY_MESSAGE instead.
+LLM_BUDGET_MAX_WAITING = int(os.getenv('LLM_BUDGET_MAX_WAITING', '32'))
+LLM_BUDGET_WAIT_TIMEOUT = float(os.getenv('LLM_BUDGET_WAIT_TIMEOUT', '15'))
+LLM_BUDGET_PER_USER = int(os.getenv('LLM_BUDGET_PER_USER', '1'))
+FILL_BUDGET_MAX_WAITING = int(os.getenv('FILL_BUDGET_MAX_WAITING', '50'))
+FILL_BUDGET_WAIT_TIMEOUT = float(os.getenv('FILL_BUDGET_WAIT_TIMEOUT', '300'))
+FILL_BUDGET_PER_USER = int(os.getenv('FILL_BUDGET_PER_USER', '1'))
+
 # Form Options
 SALUTATION_OPTIONS = [
     "Mr",
@@ -91,6 +224,11 @@ I haven't heard from you in a while.
 Feel free to start a new conversation anytime with /start 🔄
 """
 
+BUSY_MESSAGE = """
+😅 I'm helping a lot of people right now and couldn't get to that.
+Please try again in a minute or two!
+"""
+
 ERROR_MESSAGE = """
 I apologize, but I encountered an error. 
 Please try again or contact OCBC directly at +65 6363 3333.
@@ -0,0 +1,198 @@
+import argparse
+import bisect
+import json
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime
+from config import FORM_FIELDS
+from jsonl_writer import load_records
+from proc_stats import percentile
+from timing_profiles import TimingProfile, FAST
+
+logger = logging.getLogger(__name__)
+
+# Steps measured besides the per-field ones
+LOAD_STEP = 'load'
+SELECT2_OPEN_STEP = 'select2_open'
+# Upper bound from FormRecorder sessions: the user can't pick an option before the results render
+SELECT2_OPEN_RECORDED_STEP = 'select2_open_recorded'
+
+
+def _ts(value: str) -> float:
+    # JS timestamps are UTC ("...Z"); Python ones are naive local time
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _field_for(key: str) -> str:
+    """Bot field for a recorded control key (an id, or ``name:value`` for radios)."""
+    for field, spec in FORM_FIELDS.items():
+        if spec['type'] == 'radio' and key.split(':', 1)[0] == spec['name']:
+            return field
+        if spec.get('id') == key:
+            return field
+    return None
+
+
+def settle_time(start: float, reactions: list, until: float, quiet: float) -> float:
+    """Seconds from ``start`` until the page goes quiet.
+
+    ``reactions`` are sorted times of mutations and network activity. The page
+    counts as busy while reactions follow each other at most ``quiet`` apart,
+    and ready at the last one before ``until``.
+    """
+    end = start
+    i = bisect.bisect_right(reactions, start)
+    while i < len(reactions) and reactions[i] <= until and reactions[i] - end <= quiet:
+        end = reactions[i]
+        i += 1
+    return end - start
+
+
+def analyzer_samples(index_path, quiet: float, window: float) -> dict:
+    """Per-step readiness samples (ms) from one FormAnalyzer capture recorded in delta mode."""
+    network = [_ts(r['timestamp']) for r in load_records(index_path, 'requests')]
+    network += [_ts(r['timestamp']) for r in load_records(index_path, 'network')]
+    changes = [change for batch in load_records(index_path, 'changes') for change in batch['changes']]
+
+    actions = []
+    reactions = list(network)
+    for change in changes:
+        at = _ts(change['timestamp'])
+        if change['type'] == 'value':
+            actions.append((at, _field_for(change['key']) or 'other'))
+        elif (change['type'] == 'attributeChange' and change.get('attribute') == 'class'
+              and 'select2-container--open' in (change.get('value') or '')
+              and 'select2-container--open' not in (change.get('oldValue') or '')):
+            actions.append((at, SELECT2_OPEN_STEP))
+        else:
+            reactions.append(at)
+    actions.sort()
+    reactions.sort()
+
+    samples = defaultdict(list)
+    if network:
+        first_action = actions[0][0] if actions else math.inf
+        start = min(network)
+        samples[LOAD_STEP].append(settle_time(start, reactions, min(first_action, start + window), quiet) * 1000)
+    for i, (at, step) in enumerate(actions):
+        until = min(actions[i + 1][0] if i + 1 < len(actions) else math.inf, at + window)
+        samples[step].append(settle_time(at, reactions, until, quiet) * 1000)
+    return samples
+
+
+def recorder_samples(index_path) -> dict:
+    """Select2 open-to-pick gaps (ms) from one FormRecorder session."""
+    samples = defaultdict(list)
+    opened = {}
+    for interaction in load_records(index_path, 'interactions'):
+        details = interaction.get('details')
+        if interaction.get('type') != 'click' or not isinstance(details, dict) or not details.get('select2'):
+            continue
+        at = _ts(interaction['timestamp'])
+        if 'select2-results__option' in (details.get('className') or ''):
+            if details['select2'] in opened:
+                samples[SELECT2_OPEN_RECORDED_STEP].append((at - opened.pop(details['select2'])) * 1000)
+        else:
+            opened[details['select2']] = at
+    return samples
+
+
+def collect_samples(paths: list, quiet: float, window: float) -> dict:
+    """Readiness samples from every capture, telling FormAnalyzer and FormRecorder indexes apart by their streams."""
+    samples = defaultdict(list)
+    for path in paths:
+        with open(path) as f:
+            streams = json.load(f).get('streams', {})
+        try:
+            if 'interactions' in streams:
+                found = recorder_samples(path)
+            elif 'changes' in streams:
+                found = analyzer_samples(path, quiet, window)
+            else:
+                logger.warning(f"{path} has no interactions or change stream (record with --mode delta), skipping")
+                continue
+        except Exception as e:
+            logger.error(f"Error reading {path}: {str(e)}")
+            continue
+        for step, values in found.items():
+            samples[step].extend(values)
+    return samples
+
+
+def _ceil_ms(value: float) -> int:
+    return int(math.ceil(value / 10.0) * 10)
+
+
+def derive_profile(samples: dict, name='tuned', pct=95, safety=2.0, min_budget_ms=1000) -> TimingProfile:
+    """Build a timing profile whose waits are the measured readiness times at ``pct``.
+
+    Fixed pauses get the percentile itself; timeouts (field budgets and the
+    form timeout) get ``safety`` times it, but never less than
+    ``min_budget_ms``. Steps without samples keep the ``fast`` profile's values.
+    """
+    def at_pct(step):
+        return percentile(samples.get(step) or [], pct)
+
+    field_ready = {field: at_pct(field) for field in FORM_FIELDS if samples.get(field)}
+    select2_open = at_pct(SELECT2_OPEN_STEP) if samples.get(SELECT2_OPEN_STEP) else at_pct(SELECT2_OPEN_RECORDED_STEP)
+    budgets = {field: max(min_budget_ms, _ceil_ms(ready * safety)) for field, ready in field_ready.items()}
+    for field in ('best_time', 'nature_enquiry'):
+        # A Select2 pick waits for the dropdown to open and then for the selection
+        if field in budgets or select2_open:
+            budgets[field] = max(min_budget_ms, _ceil_ms((field_ready.get(field, 0) + select2_open) * safety))
+
+    form_timeout_ms = FAST.form_timeout_ms
+    if samples.get(LOAD_STEP):
+        form_timeout_ms = max(min_budget_ms, _ceil_ms(at_pct(LOAD_STEP) * safety))
+
+    return TimingProfile(
+        name=name,
+        wait_for_network_idle=False,
+        wait_for_ready_signals=True,
+        field_pause_ms=_ceil_ms(max(field_ready.values(), default=0)),
+        select2_open_ms=_ceil_ms(select2_open),
+        form_timeout_ms=form_timeout_ms,
+        default_budget_ms=max(budgets.values(), default=FAST.default_budget_ms),
+        field_budgets_ms=budgets,
+    )
+
+
+def print_report(samples: dict, pct: float):
+    header = f"{'step':<22} {'samples':>8} {'p50 ms':>9} {f'p{pct:g} ms':>9} {'max ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for step in sorted(samples):
+        values = samples[step]
+        print(f"{step:<22} {len(values):>8} {percentile(values, 50):>9.1f} "
+              f"{percentile(values, pct):>9.1f} {max(values):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive minimal fill waits from recorded sessions")
+    parser.add_argument('captures', nargs='+',
+                        help="form_analysis_*_index.json (delta mode) and form_interactions_*_index.json files")
+    parser.add_argument('--percentile', type=float, default=95)
+    parser.add_argument('--safety', type=float, default=2.0, help="multiplier applied to timeouts")
+    parser.add_argument('--min-budget-ms', type=int, default=1000)
+    parser.add_argument('--quiet-ms', type=float, default=300,
+                        help="gap in page activity after which a step counts as settled")
+    parser.add_argument('--window-ms', type=float, default=10000, help="longest settle time considered per step")
+    parser.add_argument('--name', default='tuned')
+    parser.add_argument('-o', '--output', default='timing_profile.json')
+    args = parser.parse_args()
+
+    samples = collect_samples(args.captures, args.quiet_ms / 1000, args.window_ms / 1000)
+    if not samples:
+        parser.error("no readiness samples found in the given captures")
+    print_report(samples, args.percentile)
+
+    profile = derive_profile(samples, name=args.name, pct=args.percentile, safety=args.safety,
+                             min_budget_ms=args.min_budget_ms)
+    profile.save(args.output)
+    logger.info(f"Timing profile saved to {args.output}; use it with FILL_TIMING_PROFILE={args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,306 @@
+import argparse
+import json
+import logging
+import time
+from urllib.parse import parse_qsl, urlencode
+from jsonl_writer import load_records
+
+logger = logging.getLogger(__name__)
+
+# Headers that belong to the captured connection rather than to the submission itself
+DROPPED_HEADERS = ('host', 'content-length', 'cookie', 'connection', 'accept-encoding')
+
+SUBMIT_METHODS = ('POST', 'PUT', 'PATCH')
+
+
+class StaleTemplateError(Exception):
+    """The live endpoint no longer answers the way it did when the template was captured."""
+
+
+class SubmissionTemplate:
+    """A captured form submission request with the user's values replaced by placeholders.
+
+    ``body`` is a dict for JSON and urlencoded submissions, or a string for any
+    other format; ``fields`` maps each form field to the placeholder used for it.
+    ``expected`` describes the recorded response: status code, content type and,
+    for JSON responses, top-level keys that must be present.
+
+    Templates only cover endpoints that don't require per-session tokens; a
+    submission that needs a fresh CSRF token will fail verification and fall
+    back to the browser.
+    """
+
+    def __init__(self, url, method, headers, body, body_format, fields, expected):
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.body = body
+        self.body_format = body_format
+        self.fields = fields
+        self.expected = expected
+
+    @classmethod
+    def from_capture(cls, requests: list, sample_values: dict, network_data: list = None) -> "SubmissionTemplate":
+        """Build a template from FormAnalyzer's captured requests.
+
+        ``sample_values`` are the values typed into the form while capturing; the
+        submission is the request whose body contains most of them.
+
+        Raises ``ValueError`` if two fields share a sample value or if any
+        non-empty sample value isn't found in the chosen body, since the
+        recorded value would otherwise be sent for every later user.
+        """
+        fields_by_value = {}
+        for field, v in sample_values.items():
+            if v:
+                fields_by_value.setdefault(str(v), []).append(field)
+        shared = [fields for fields in fields_by_value.values() if len(fields) > 1]
+        if shared:
+            raise ValueError(f"Sample values must be distinct per field, shared by {shared}")
+
+        best, best_matches = None, 0
+        for request in requests:
+            if request.get('method') not in SUBMIT_METHODS or not request.get('post_data'):
+                continue
+            values = cls._body_values(request)
+            matches = sum(1 for v in sample_values.values() if v and (
+                str(v) in values if values is not None else str(v) in request['post_data']))
+            if matches > best_matches:
+                best, best_matches = request, matches
+        if not best:
+            raise ValueError("No captured request contains the sample values")
+
+        headers = {k: v for k, v in best['headers'].items()
+                   if k.lower() not in DROPPED_HEADERS and not k.startswith(':')}
+        content_type = cls._content_type(headers)
+        placeholders = {str(v): cls._placeholder(field) for field, v in sample_values.items() if v}
+
+        if 'json' in content_type:
+            body_format = 'json'
+            body = cls._substitute(json.loads(best['post_data']), placeholders)
+        elif 'x-www-form-urlencoded' in content_type:
+            body_format = 'form'
+            body = cls._substitute(dict(parse_qsl(best['post_data'], keep_blank_values=True)), placeholders)
+        else:
+            body_format = 'raw'
+            body = best['post_data']
+            for value, placeholder in placeholders.items():
+                body = body.replace(value, placeholder)
+
+        rendered = body if body_format == 'raw' else json.dumps(body)
+        unmatched = [field for field, v in sample_values.items() if v and cls._placeholder(field) not in rendered]
+        if unmatched:
+            raise ValueError(f"The captured {best['method']} {best['url']} doesn't contain the sample values "
+                             f"of {unmatched}; re-capture with exactly these values typed into the form")
+
+        expected = {'status': 200, 'content_type': None, 'json_keys': []}
+        for response in network_data or []:
+            if response['url'] == best['url']:
+                expected['status'] = response['status']
+                expected['content_type'] = (response['headers'].get('content-type') or '').split(';')[0] or None
+                if isinstance(response.get('json'), dict):
+                    expected['json_keys'] = sorted(response['json'])
+                break
+
+        logger.info(f"Captured {best['method']} {best['url']} as a submission template "
+                    f"({best_matches}/{len(sample_values)} fields matched)")
+        if expected['content_type'] and 'json' in expected['content_type'] and not expected['json_keys']:
+            logger.warning("The captured response has no recorded JSON body; live responses will only be "
+                           "checked by status and content type (re-capture with the current form_analyzer.py)")
+        return cls(best['url'], best['method'], headers, body, body_format,
+                   {field: cls._placeholder(field) for field in sample_values}, expected)
+
+    def render(self, user_data: dict):
+        """Return the request body with placeholders replaced by ``user_data``."""
+        values = {placeholder: str(user_data.get(field, '')) for field, placeholder in self.fields.items()}
+        if self.body_format == 'raw':
+            body = self.body
+            for placeholder, value in values.items():
+                body = body.replace(placeholder, value)
+            return body
+        body = self._substitute(self.body, values)
+        if self.body_format == 'json':
+            return json.dumps(body)
+        return urlencode(body)
+
+    def verify(self, status: int, content_type: str, payload) -> bool:
+        """Check a live response against the recorded response shape."""
+        if status != self.expected.get('status', 200):
+            return False
+        expected_type = self.expected.get('content_type')
+        if expected_type and (content_type or '').split(';')[0] != expected_type:
+            return False
+        keys = self.expected.get('json_keys') or []
+        if keys and not (isinstance(payload, dict) and all(k in payload for k in keys)):
+            return False
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            'url': self.url,
+            'method': self.method,
+            'headers': self.headers,
+            'body': self.body,
+            'body_format': self.body_format,
+            'fields': self.fields,
+            'expected': self.expected,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SubmissionTemplate":
+        return cls(data['url'], data['method'], data['headers'], data['body'],
+                   data['body_format'], data['fields'], data['expected'])
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path) -> "SubmissionTemplate":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @staticmethod
+    def _content_type(headers: dict) -> str:
+        return next((v for k, v in headers.items() if k.lower() == 'content-type'), '')
+
+    @classmethod
+    def _body_values(cls, request: dict):
+        """Decoded string values of a JSON or urlencoded request body; None for other formats."""
+        content_type = cls._content_type(request.get('headers') or {})
+        try:
+            if 'json' in content_type:
+                values, stack = set(), [json.loads(request['post_data'])]
+                while stack:
+                    value = stack.pop()
+                    if isinstance(value, dict):
+                        stack.extend(value.values())
+                    elif isinstance(value, list):
+                        stack.extend(value)
+                    elif value is not None:
+                        values.add(str(value))
+                return values
+            if 'x-www-form-urlencoded' in content_type:
+                return {v for _, v in parse_qsl(request['post_data'], keep_blank_values=True)}
+        except ValueError:
+            pass
+        return None
+
+    @staticmethod
+    def _placeholder(field: str) -> str:
+        return '{{' + field + '}}'
+
+    @classmethod
+    def _substitute(cls, value, replacements: dict):
+        if isinstance(value, dict):
+            return {k: cls._substitute(v, replacements) for k, v in value.items()}
+        if isinstance(value, list):
+            return [cls._substitute(v, replacements) for v in value]
+        if isinstance(value, str):
+            return replacements.get(value, value)
+        return value
+
+
+class DirectSubmitter:
+    """Submits enquiries straight to the form's endpoint over a pooled HTTP session.
+
+    After a response fails verification the template is considered stale and
+    ``usable`` stays false for ``stale_retry_interval`` seconds, so callers fall
+    back to the browser path without paying for a doomed request each time.
+    """
+
+    def __init__(self, template: SubmissionTemplate, timeout=10.0, max_connections=20,
+                 stale_retry_interval=600.0):
+        self.template = template
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.stale_retry_interval = stale_retry_interval
+        self._session = None
+        self._stale_until = 0.0
+
+        self.submitted = 0
+        self.rejected = 0
+
+    @property
+    def usable(self) -> bool:
+        return time.monotonic() >= self._stale_until
+
+    async def start(self):
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+    async def stop(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def submit(self, user_data: dict) -> str:
+        """Submit the enquiry and return the final response URL.
+
+        Raises :class:`StaleTemplateError` if the response doesn't match the
+        recorded shape; network errors propagate unchanged.
+        """
+        await self.start()
+        template = self.template
+        async with self._session.request(template.method, template.url, headers=template.headers,
+                                         data=template.render(user_data)) as response:
+            content_type = response.headers.get('content-type', '')
+            payload = None
+            if 'json' in content_type:
+                try:
+                    payload = await response.json(content_type=None)
+                except ValueError:
+                    pass
+            else:
+                await response.read()
+
+            if not template.verify(response.status, content_type, payload):
+                self.rejected += 1
+                self._stale_until = time.monotonic() + self.stale_retry_interval
+                raise StaleTemplateError(
+                    f"Unexpected response from {template.url}: {response.status} {content_type}"
+                )
+            self.submitted += 1
+            return str(response.url)
+
+    def stats(self) -> dict:
+        return {
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'stale': not self.usable,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a direct submission template from FormAnalyzer output")
+    parser.add_argument('capture', help="form_analysis_*_index.json written by form_analyzer.py "
+                                        "(or a JSON list of captured requests)")
+    parser.add_argument('--network', help="responses file when CAPTURE is a plain list of requests")
+    parser.add_argument('--sample', nargs='+', required=True, metavar='FIELD=VALUE',
+                        help="values typed into the form while capturing, e.g. full_name='Jane Tan'")
+    parser.add_argument('-o', '--output', default='submission_template.json')
+    args = parser.parse_args()
+
+    requests = load_records(args.capture, 'requests')
+    network_data = []
+    if args.network:
+        network_data = load_records(args.network)
+    elif args.capture.endswith('_index.json'):
+        network_data = load_records(args.capture, 'network')
+    sample_values = dict(item.split('=', 1) for item in args.sample)
+
+    try:
+        template = SubmissionTemplate.from_capture(requests, sample_values, network_data)
+    except ValueError as e:
+        parser.error(str(e))
+    template.save(args.output)
+    logger.info(f"Submission template saved to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
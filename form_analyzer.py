@@ -1,4 +1,6 @@
 from playwright.sync_api import sync_playwright
+import argparse
+import hashlib
 import logging
 import json
 from datetime import datetime
@@ -6,21 +8,151 @@ import signal
 import sys
 import time
 import os
+from jsonl_writer import JsonlWriter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Records history changes, DOM mutations and edited control values in
+# ``window.formStateChanges`` and, once the page has been quiet for
+# ``debounce_ms`` (or at the latest ``max_wait_ms`` after the first change),
+# drains them in batches of up to ``batch_size`` to ``reportFormChanges``.
+# Repeated edits of one control between flushes collapse to its latest value.
+CHANGE_TRACKER_SCRIPT = """
+    window.formStateChanges = [];
+    const pendingValues = new Map();
+    let flushTimer = null;
+    let firstChangeAt = null;
+
+    function getXPath(element) {
+        if (!element || element.nodeType !== 1) return '';
+        if (element.id !== '') return `//*[@id="${element.id}"]`;
+        if (element === document.body) return element.tagName;
+        let ix = 0;
+        const siblings = element.parentNode ? element.parentNode.childNodes : [];
+        for (let i = 0; i < siblings.length; i++) {
+            const sibling = siblings[i];
+            if (sibling === element) return getXPath(element.parentNode) + '/' + element.tagName + '[' + (ix + 1) + ']';
+            if (sibling.nodeType === 1 && sibling.tagName === element.tagName) ix++;
+        }
+        return '';
+    }
+
+    function describe(node) {
+        if (node.nodeType !== 1) return node.nodeName;
+        return node.tagName + (node.id ? '#' + node.id : '');
+    }
+
+    function flush() {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+        firstChangeAt = null;
+        for (const change of pendingValues.values()) window.formStateChanges.push(change);
+        pendingValues.clear();
+        while (window.formStateChanges.length && window.reportFormChanges) {
+            window.reportFormChanges(window.formStateChanges.splice(0, %(batch_size)d));
+        }
+    }
+
+    function schedule() {
+        const now = Date.now();
+        if (firstChangeAt === null) firstChangeAt = now;
+        clearTimeout(flushTimer);
+        const wait = Math.max(0, Math.min(%(debounce_ms)d, firstChangeAt + %(max_wait_ms)d - now));
+        flushTimer = setTimeout(flush, wait);
+    }
+
+    for (const method of ['pushState', 'replaceState']) {
+        const original = history[method];
+        history[method] = function() {
+            window.formStateChanges.push({
+                type: method,
+                url: String(arguments[2] || ''),
+                timestamp: new Date().toISOString()
+            });
+            schedule();
+            return original.apply(this, arguments);
+        };
+    }
+
+    function recordValue(event) {
+        const element = event.target;
+        if (!element || !['INPUT', 'SELECT', 'TEXTAREA'].includes(element.tagName)) return;
+        const key = element.id || (element.type === 'radio' ? `${element.name}:${element.value}` : element.name);
+        if (!key) return;
+        const change = {type: 'value', key, value: element.value, timestamp: new Date().toISOString()};
+        if (element.type === 'radio' || element.type === 'checkbox') change.checked = element.checked;
+        pendingValues.set(key, change);
+        schedule();
+    }
+    document.addEventListener('input', recordValue, true);
+    document.addEventListener('change', recordValue, true);
+
+    const observer = new MutationObserver((mutations) => {
+        mutations.forEach((mutation) => {
+            if (mutation.type === 'attributes') {
+                window.formStateChanges.push({
+                    type: 'attributeChange',
+                    xpath: getXPath(mutation.target),
+                    attribute: mutation.attributeName,
+                    oldValue: mutation.oldValue,
+                    value: mutation.target.getAttribute(mutation.attributeName),
+                    timestamp: new Date().toISOString()
+                });
+            } else if (mutation.type === 'childList') {
+                window.formStateChanges.push({
+                    type: 'childList',
+                    xpath: getXPath(mutation.target),
+                    added: Array.from(mutation.addedNodes).map(describe),
+                    removed: Array.from(mutation.removedNodes).map(describe),
+                    timestamp: new Date().toISOString()
+                });
+            }
+        });
+        schedule();
+    });
+
+    document.addEventListener('DOMContentLoaded', () => {
+        const form = document.querySelector('form');
+        if (form) {
+            observer.observe(form, {
+                attributes: true,
+                childList: true,
+                subtree: true,
+                attributeOldValue: true
+            });
+        }
+    });
+    window.addEventListener('pagehide', flush);
+"""
+
+
 class FormAnalyzer:
-    def __init__(self):
-        self.requests = []
+    def __init__(self, max_segment_bytes=50 * 1024 * 1024, compress=False, mode='delta',
+                 debounce=0.5, max_wait=5.0, batch_size=500):
+        self.mode = mode
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.batch_size = batch_size
+        self.needs_baseline = False
+        self.change_count = 0
+        self.request_count = 0
+        self.response_count = 0
         self.form_state = {}
-        self.network_data = []
+        self.state_hash = None
+        self.screenshot_name = None
         self.page = None
         self.should_exit = False
         
         # Create output directory
         self.output_dir = "form_analysis_output"
         os.makedirs(self.output_dir, exist_ok=True)
+
+        # Records are appended to JSONL streams (requests, network, state) as they
+        # arrive, instead of re-dumping everything captured so far on every save
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output = JsonlWriter(self.output_dir, f"form_analysis_{self.timestamp}",
+                                  max_bytes=max_segment_bytes, compress=compress)
         
     def signal_handler(self, signum, frame):
         """Handle Ctrl+C by setting exit flag."""
@@ -29,29 +161,50 @@ class FormAnalyzer:
         
     def handle_request(self, request):
         """Record all network requests."""
-        self.requests.append({
+        self.output.write('requests', {
             'url': request.url,
             'method': request.method,
             'headers': request.headers,
             'post_data': request.post_data,
             'timestamp': datetime.now().isoformat()
         })
+        self.request_count += 1
         
     def handle_response(self, response):
         """Record responses."""
         if response.request.resource_type == "xhr" or response.request.resource_type == "fetch":
             try:
-                self.network_data.append({
+                record = {
                     'url': response.url,
                     'status': response.status,
                     'headers': response.headers,
                     'timestamp': datetime.now().isoformat()
-                })
+                }
+                if 'json' in (response.headers.get('content-type') or ''):
+                    # Kept so direct submission templates can check the response shape
+                    try:
+                        record['json'] = response.json()
+                    except Exception as e:
+                        logger.debug(f"Could not read JSON body of {response.url}: {str(e)}")
+                self.output.write('network', record)
+                self.response_count += 1
             except Exception as e:
                 logger.error(f"Error processing response: {str(e)}")
 
-    def save_current_state(self):
-        """Save the current form state and analysis data."""
+    def handle_changes(self, changes):
+        """Append a batch of page changes drained by the in-page tracker (delta mode)."""
+        try:
+            self.output.write('changes', {
+                'timestamp': datetime.now().isoformat(),
+                'url': self.page.url if self.page else None,
+                'changes': changes,
+            })
+            self.change_count += len(changes)
+        except Exception as e:
+            logger.error(f"Error processing changes: {str(e)}")
+
+    def save_current_state(self, final=False):
+        """Append the form state if it changed; on the final save also take a screenshot and write the index."""
         try:
             # Get current form state
             self.form_state = self.page.evaluate("""() => {
@@ -164,36 +317,33 @@ class FormAnalyzer:
                 };
             }""")
             
-            # Save analysis results
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Save network requests
-            with open(os.path.join(self.output_dir, f'form_analysis_requests_{timestamp}.json'), 'w') as f:
-                json.dump(self.requests, f, indent=2)
-            
-            # Save form state
-            with open(os.path.join(self.output_dir, f'form_analysis_state_{timestamp}.json'), 'w') as f:
-                json.dump(self.form_state, f, indent=2)
-            
-            # Save network data
-            with open(os.path.join(self.output_dir, f'form_analysis_network_{timestamp}.json'), 'w') as f:
-                json.dump(self.network_data, f, indent=2)
-            
-            # Take a screenshot
-            screenshot_path = os.path.join(self.output_dir, f'form_screenshot_{timestamp}.png')
-            self.page.screenshot(path=screenshot_path)
-            
-            logger.info(f"\nAnalysis results saved in {self.output_dir}:")
-            logger.info(f"- Requests: form_analysis_requests_{timestamp}.json")
-            logger.info(f"- Form State: form_analysis_state_{timestamp}.json")
-            logger.info(f"- Network Data: form_analysis_network_{timestamp}.json")
-            logger.info(f"- Screenshot: form_screenshot_{timestamp}.png")
+            # Only append the state when something other than its timestamp changed
+            snapshot = {k: v for k, v in self.form_state.items() if k != 'timestamp'}
+            state_hash = hashlib.sha1(json.dumps(snapshot, sort_keys=True).encode()).hexdigest()
+            if state_hash != self.state_hash:
+                self.state_hash = state_hash
+                self.output.write('state', self.form_state)
+
+            if final:
+                screenshot_name = f'form_screenshot_{self.timestamp}.png'
+                self.page.screenshot(path=os.path.join(self.output_dir, screenshot_name))
+                self.screenshot_name = screenshot_name
             
         except Exception as e:
             logger.error(f"Error saving state: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
 
+    def finish(self):
+        """Flush the JSONL streams and write the consolidated index."""
+        index_path = self.output.close({'screenshot': self.screenshot_name})
+        logger.info(f"\nAnalysis results saved in {self.output_dir}:")
+        for stream, info in self.output.streams.items():
+            logger.info(f"- {stream}: {info['records']} record(s) in {len(info['segments'])} segment(s)")
+        if self.screenshot_name:
+            logger.info(f"- Screenshot: {self.screenshot_name}")
+        logger.info(f"- Index: {index_path.name}")
+
     def analyze_form(self):
         """Analyze the form behavior."""
         # Set up signal handler for Ctrl+C
@@ -211,58 +361,15 @@ class FormAnalyzer:
             self.page.on("request", self.handle_request)
             self.page.on("response", self.handle_response)
             
-            # Monitor form state changes
-            self.page.add_init_script("""
-                window.formStateChanges = [];
-                const originalPushState = history.pushState;
-                const originalReplaceState = history.replaceState;
-                
-                history.pushState = function() {
-                    window.formStateChanges.push({
-                        type: 'pushState',
-                        arguments: Array.from(arguments),
-                        timestamp: new Date().toISOString()
-                    });
-                    return originalPushState.apply(this, arguments);
-                };
-                
-                history.replaceState = function() {
-                    window.formStateChanges.push({
-                        type: 'replaceState',
-                        arguments: Array.from(arguments),
-                        timestamp: new Date().toISOString()
-                    });
-                    return originalReplaceState.apply(this, arguments);
-                };
-                
-                // Monitor form element changes
-                const observer = new MutationObserver((mutations) => {
-                    mutations.forEach((mutation) => {
-                        if (mutation.type === 'attributes') {
-                            window.formStateChanges.push({
-                                type: 'attributeChange',
-                                element: mutation.target.tagName,
-                                attribute: mutation.attributeName,
-                                value: mutation.target.getAttribute(mutation.attributeName),
-                                timestamp: new Date().toISOString()
-                            });
-                        }
-                    });
-                });
-                
-                // Start observing once form is loaded
-                document.addEventListener('DOMContentLoaded', () => {
-                    const form = document.querySelector('form');
-                    if (form) {
-                        observer.observe(form, {
-                            attributes: true,
-                            childList: true,
-                            subtree: true,
-                            attributeOldValue: true
-                        });
-                    }
-                });
-            """)
+            if self.mode == 'delta':
+                # The page pushes debounced batches of changes through this binding
+                self.page.expose_function("reportFormChanges", self.handle_changes)
+                self.page.on("load", lambda _: setattr(self, 'needs_baseline', True))
+                self.page.add_init_script(CHANGE_TRACKER_SCRIPT % {
+                    'debounce_ms': int(self.debounce * 1000),
+                    'max_wait_ms': int(self.max_wait * 1000),
+                    'batch_size': self.batch_size,
+                })
             
             # Navigate to form
             logger.info("Navigating to form...")
@@ -280,23 +387,47 @@ class FormAnalyzer:
             logger.info("="*50 + "\n")
             
             try:
+                if self.mode == 'delta':
+                    # One full baseline; afterwards only the page's change batches are stored
+                    self.save_current_state()
+                    self.needs_baseline = False
                 # Keep browser open for manual interaction
                 while not self.should_exit:
-                    time.sleep(1)  # Check exit flag every second
-                    # Periodically save state
-                    if len(self.requests) > 0 or len(self.network_data) > 0:
-                        self.save_current_state()
+                    if self.mode == 'delta':
+                        # Lets Playwright dispatch reportFormChanges calls while waiting
+                        self.page.wait_for_timeout(250)
+                        if self.needs_baseline:
+                            # A navigation resets the page, so start again from a full snapshot
+                            self.needs_baseline = False
+                            self.save_current_state()
+                    else:
+                        time.sleep(1)  # Check exit flag every second
+                        # Periodically save state
+                        if self.request_count or self.response_count:
+                            self.save_current_state()
             except Exception as e:
                 logger.error(f"Error during analysis: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
             finally:
                 # Save final state
-                self.save_current_state()
+                self.save_current_state(final=True)
+                self.finish()
                 browser.close()
 
 def main():
-    analyzer = FormAnalyzer()
+    parser = argparse.ArgumentParser(description="Record network traffic and form state while you fill the form")
+    parser.add_argument('--max-segment-mb', type=float, default=50, help="start a new JSONL segment beyond this size")
+    parser.add_argument('--compress', action='store_true', help="gzip finished segments")
+    parser.add_argument('--mode', choices=('delta', 'full'), default='delta',
+                        help="delta: one baseline snapshot plus debounced change batches; "
+                             "full: re-read the whole form every second")
+    parser.add_argument('--debounce', type=float, default=0.5, help="seconds of quiet before changes are flushed")
+    parser.add_argument('--max-wait', type=float, default=5.0, help="flush at least this often while changes keep coming")
+    args = parser.parse_args()
+
+    analyzer = FormAnalyzer(max_segment_bytes=int(args.max_segment_mb * 1024 * 1024), compress=args.compress,
+                            mode=args.mode, debounce=args.debounce, max_wait=args.max_wait)
     analyzer.analyze_form()
 
 if __name__ == "__main__":
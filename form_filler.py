@@ -0,0 +1,396 @@
+import logging
+from config import FORM_FIELDS
+from metrics import timed, FILL_STAGE_SECONDS, FILL_FIELD_SECONDS, FILL_FALLBACKS_TOTAL
+from screenshot_store import ScreenshotStore
+from timing_profiles import TimingProfile, HUMAN_LIKE
+
+logger = logging.getLogger(__name__)
+
+# Selectors discovered from recorded interactions with the live form
+SALUTATION_RADIO = '//input[@type="radio"][@value="{value}"]'
+NAME_INPUT = '//input[contains(@placeholder, "name") or contains(@aria-label, "name")]'
+CONTACT_INPUT = '//input[@type="tel" or contains(@placeholder, "contact") or contains(@placeholder, "phone")]'
+EMAIL_INPUT = '//input[@type="email" or contains(@placeholder, "email")]'
+SELECT2_CONTAINER = '//label[contains(text(), "{label}")]/following::div[contains(@class, "select2-container")]'
+SELECT2_OPTION = '//li[contains(@class, "select2-results__option") and contains(text(), "{value}")]'
+SELECT2_RESULTS = '.select2-results__option'
+
+TEXT_INPUTS = {
+    'full_name': NAME_INPUT,
+    'contact': CONTACT_INPUT,
+    'email': EMAIL_INPUT,
+}
+SELECT2_LABELS = {
+    'best_time': "best time",
+    'nature_enquiry': "nature of enquiry",
+}
+# Reads back every field described by config.FORM_FIELDS in one query.
+# Missing elements come back as null so they can be told apart from wrong values.
+READ_BACK_SCRIPT = """(fields) => {
+    const values = {};
+    for (const [field, spec] of Object.entries(fields)) {
+        values[field] = null;
+        if (spec.type === 'radio') {
+            const radios = Array.from(document.getElementsByName(spec.name));
+            if (!radios.length) continue;
+            const checked = radios.find(r => r.checked);
+            values[field] = checked
+                ? { value: checked.value, label: Array.from(checked.labels || []).map(l => l.textContent.trim()).join(' ') }
+                : { value: '', label: '' };
+        } else {
+            const el = document.getElementById(spec.id);
+            if (!el) continue;
+            if (el.tagName === 'SELECT') {
+                const option = el.options[el.selectedIndex];
+                values[field] = { value: el.value, label: option ? option.text.trim() : '' };
+            } else {
+                values[field] = { value: el.value, label: '' };
+            }
+        }
+    }
+    return values;
+}"""
+
+FIELD_ORDER = ('salutation', 'full_name', 'contact', 'email', 'best_time', 'nature_enquiry')
+
+# Sets the radio, text inputs and Select2-backed selects described by
+# config.FORM_FIELDS in one round trip, firing the events each widget listens for.
+BATCH_FILL_SCRIPT = """({fields, data}) => {
+    const results = {};
+    const fire = (el, ...types) => types.forEach(type => el.dispatchEvent(new Event(type, { bubbles: true })));
+    const setValue = (el, value) => {
+        // Use the prototype setter so framework-controlled inputs notice the change
+        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+    };
+
+    for (const [field, spec] of Object.entries(fields)) {
+        const value = data[field];
+        results[field] = false;
+        if (value === undefined || value === null) continue;
+        try {
+            if (spec.type === 'radio') {
+                const radios = Array.from(document.getElementsByName(spec.name));
+                const radio = radios.find(r => r.value === value)
+                    || radios.find(r => Array.from(r.labels || []).some(l => l.textContent.trim() === value));
+                if (!radio) continue;
+                if (!radio.checked) radio.click();
+                results[field] = radio.checked;
+            } else if (spec.type === 'select2') {
+                const select = document.getElementById(spec.id);
+                if (!select || !select.options) continue;
+                const options = Array.from(select.options);
+                const option = options.find(o => o.text.trim() === value) || options.find(o => o.text.includes(value));
+                if (!option) continue;
+                select.value = option.value;
+                if (window.jQuery) {
+                    // Updates Select2's rendered selection and runs jQuery-bound handlers
+                    window.jQuery(select).trigger('change');
+                } else {
+                    fire(select, 'input', 'change');
+                }
+                results[field] = select.value === option.value;
+            } else {
+                const input = document.getElementById(spec.id);
+                if (!input || input.disabled || input.readOnly) continue;
+                input.focus();
+                setValue(input, value);
+                fire(input, 'input', 'change');
+                input.blur();
+                results[field] = input.value === value;
+            }
+        } catch (e) {
+            console.error(`Batch fill of ${field} failed: ${e}`);
+        }
+    }
+    return results;
+}"""
+
+
+class FillVerificationError(Exception):
+    """The values read back from the page don't match the user's details, or a field is missing."""
+
+    def __init__(self, mismatches: dict):
+        super().__init__(f"Form fields do not match: {sorted(mismatches)}")
+        self.mismatches = mismatches
+
+
+class FormFiller:
+    """Fills the loan enquiry form on a Playwright page according to a timing profile.
+
+    The ``stepwise`` strategy fills one field at a time through Playwright. The
+    ``batch`` strategy sets every field in a single ``page.evaluate`` and only
+    falls back to the stepwise path for fields the batch could not set.
+
+    With a ``schema_cache`` the exact selectors of the cached form schema are
+    used; otherwise, or if the live form can't be mapped, ``fields`` and the
+    heuristic XPath selectors are.
+
+    With a ``replay`` runner the steps compiled from a recorded session are
+    replayed instead of either strategy, and fields the replay didn't set are
+    filled one at a time.
+    """
+
+    def __init__(self, form_url: str, timing: TimingProfile = HUMAN_LIKE,
+                 screenshots: ScreenshotStore = None, resource_policy=None, asset_cache=None,
+                 strategy: str = 'stepwise', fields: dict = None, schema_cache=None, replay=None):
+        self.form_url = form_url
+        self.timing = timing
+        self.strategy = strategy
+        self.fields = fields or FORM_FIELDS
+        self.resource_policy = resource_policy
+        self.asset_cache = asset_cache
+        self.schema_cache = schema_cache
+        self.replay = replay
+        self.screenshots = screenshots or ScreenshotStore()
+
+    async def fill(self, page, user_data: dict) -> str:
+        """Fill every field from ``user_data`` and return the resulting page URL.
+
+        Raises :class:`FillVerificationError` if the values read back from the
+        page differ from ``user_data`` or can't be read back at all.
+        """
+        # Enable debug logging
+        page.on("console", lambda msg: logger.info(f"Browser console: {msg.text}"))
+        page.on("pageerror", lambda err: logger.error(f"Browser error: {err}"))
+
+        try:
+            await self.load(page)
+
+            schema = None
+            if self.schema_cache:
+                with timed(FILL_STAGE_SECONDS, stage='schema'):
+                    schema = await self.schema_cache.resolve(page)
+                if not schema:
+                    FILL_FALLBACKS_TOTAL.labels(path='schema_to_heuristics').inc()
+            fields = schema.fields if schema else self.fields
+
+            if self.replay:
+                with timed(FILL_STAGE_SECONDS, stage='replay'):
+                    results = await self.replay.run(page, user_data)
+                pending = [field for field in FIELD_ORDER if not results.get(field)]
+                if pending:
+                    logger.warning(f"Replay didn't set {pending}, falling back to per-field filling")
+                    FILL_FALLBACKS_TOTAL.labels(path='replay_to_stepwise').inc(len(pending))
+            elif self.strategy == 'batch':
+                results = await self.batch_fill(page, user_data, fields)
+                pending = [field for field in FIELD_ORDER if not results.get(field)]
+                if pending:
+                    logger.warning(f"Batch fill missed {pending}, falling back to per-field filling")
+                    FILL_FALLBACKS_TOTAL.labels(path='batch_to_stepwise').inc(len(pending))
+            else:
+                pending = list(FIELD_ORDER)
+
+            for field in pending:
+                with timed(FILL_FIELD_SECONDS, field=field):
+                    await self.fill_field(page, field, user_data[field], schema)
+
+            with timed(FILL_STAGE_SECONDS, stage='verify'):
+                mismatches = await self.verify(page, user_data, fields)
+        except Exception:
+            await self.capture_screenshot(page, 'error')
+            raise
+
+        if mismatches:
+            await self.capture_screenshot(page, 'mismatch')
+            raise FillVerificationError(mismatches)
+        if self.screenshots.should_sample():
+            await self.capture_screenshot(page, 'sample')
+
+        # Get the current URL with form data
+        filled_url = page.url
+        logger.info(f"Form URL: {filled_url}")
+
+        # Keep the page open longer to show the filled form
+        await self._pause(page, self.timing.hold_open_ms)
+        return filled_url
+
+    async def verify(self, page, user_data: dict, fields: dict = None) -> dict:
+        """Read every field back in one query and return ``{field: actual}`` for mismatches.
+
+        A field the user gave a value for that can't be found on the page counts
+        as a mismatch with ``actual`` set to ``None``, as does every field when
+        none of them can be found.
+        """
+        fields = fields or self.fields
+        values = await page.evaluate(READ_BACK_SCRIPT, fields)
+        mismatches = {}
+        missing = [field for field in fields if values.get(field) is None]
+        for field in fields:
+            expected = user_data.get(field)
+            actual = values.get(field)
+            if actual is None:
+                if expected or len(missing) == len(fields):
+                    mismatches[field] = None
+            elif expected not in (actual['value'], actual['label']) and not (
+                    fields[field]['type'] == 'select2' and expected and expected in actual['label']):
+                mismatches[field] = actual
+        if missing:
+            logger.warning(f"Could not find {missing} on the page to verify them")
+        if mismatches:
+            logger.error(f"Filled values do not match for {sorted(mismatches)}: {mismatches}")
+        return mismatches
+
+    async def batch_fill(self, page, user_data: dict, fields: dict = None) -> dict:
+        """Set every field in a single in-page script and return ``{field: success}``."""
+        logger.info("Filling all fields in one batch...")
+        fields = fields or self.fields
+        try:
+            with timed(FILL_STAGE_SECONDS, stage='batch_fill'):
+                return await page.evaluate(BATCH_FILL_SCRIPT, {
+                    'fields': fields,
+                    'data': {field: user_data.get(field) for field in fields},
+                })
+        except Exception as e:
+            logger.error(f"Batch fill failed: {str(e)}")
+            return {}
+
+    async def fill_field(self, page, field: str, value: str, schema=None):
+        """Fill a single field with the schema's exact selectors, or the heuristic ones without a schema."""
+        if field == 'salutation':
+            await self.select_salutation(page, value, schema.selector(field, value) if schema else None)
+        elif field in TEXT_INPUTS:
+            await self.enter_text(page, field, schema.selector(field) if schema else TEXT_INPUTS[field], value)
+        elif field in SELECT2_LABELS:
+            container = schema.fields[field]['container'] if schema else None
+            await self.select2(page, field, SELECT2_LABELS[field], value, container)
+
+    async def select_salutation(self, page, value: str, selector: str = None):
+        logger.info(f"Selecting salutation: {value}")
+        try:
+            salutation_radio = selector or SALUTATION_RADIO.format(value=value)
+            await page.wait_for_selector(salutation_radio, state='attached',
+                                         timeout=self.timing.budget('salutation'))
+            await page.click(salutation_radio)
+        except Exception as e:
+            logger.error(f"Failed to select salutation: {str(e)}")
+            FILL_FALLBACKS_TOTAL.labels(path='salutation_script').inc()
+            # Try alternative selector
+            try:
+                await page.evaluate("""(value) => {
+                    const radios = Array.from(document.querySelectorAll('input[type="radio"]'));
+                    const radio = radios.find(r => r.value === value);
+                    if (radio) radio.click();
+                }""", value)
+            except Exception as e:
+                logger.error(f"Alternative salutation selection failed: {str(e)}")
+
+        await self._pause(page, self.timing.field_pause_ms)
+
+    async def load(self, page):
+        """Navigate to the form and wait until it can be filled."""
+        # Routes run in reverse order: the policy decides first, then falls back to the cache
+        if self.asset_cache:
+            await self.asset_cache.install(page)
+        if self.resource_policy:
+            await self.resource_policy.install(page)
+
+        logger.info("Navigating to form...")
+        with timed(FILL_STAGE_SECONDS, stage='goto'):
+            if self.timing.wait_for_network_idle:
+                await page.goto(self.form_url)
+            else:
+                await page.goto(self.form_url, wait_until="domcontentloaded")
+
+        with timed(FILL_STAGE_SECONDS, stage='load_states'):
+            if self.timing.wait_for_network_idle:
+                logger.info("Waiting for page to be fully loaded...")
+                await page.wait_for_load_state("networkidle")
+                await page.wait_for_load_state("domcontentloaded")
+            await self._pause(page, self.timing.load_settle_ms)
+
+        logger.info("Waiting for form to be ready...")
+        with timed(FILL_STAGE_SECONDS, stage='form_ready'):
+            await page.wait_for_selector('form', state='visible', timeout=self.timing.form_timeout_ms)
+
+        if self.timing.scroll_pause_ms:
+            # Scroll the page slowly to simulate reading
+            logger.info("Scrolling through the page...")
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight/2)")
+            await self._pause(page, self.timing.scroll_pause_ms)
+
+    async def enter_text(self, page, field: str, selector: str, value: str):
+        """Enter a text value, by typing or by bulk fill depending on the profile."""
+        logger.info(f"Entering {field}: {value}")
+        budget = self.timing.budget(field)
+        try:
+            element = await page.wait_for_selector(selector, timeout=budget)
+            if self.timing.type_delay_ms:
+                await page.click(selector)
+                await page.fill(selector, "")
+                await page.type(selector, value, delay=self.timing.type_delay_ms)
+            else:
+                # fill() itself waits for the input to be enabled and editable
+                await page.fill(selector, value, timeout=budget)
+            if self.timing.wait_for_ready_signals:
+                await page.wait_for_function("([el, value]) => el.value === value",
+                                             arg=[element, value], timeout=budget)
+        except Exception as e:
+            logger.error(f"Failed to enter {field}: {str(e)}")
+
+        await self._pause(page, self.timing.field_pause_ms)
+
+    async def select2(self, page, field: str, label: str, value: str, container: str = None):
+        """Pick ``value`` in the Select2 dropdown at ``container``, or the one following the label ``label``."""
+        logger.info(f"Handling {label} selection: {value}")
+        with timed(FILL_STAGE_SECONDS, stage='select2'):
+            await self._select2(page, field, label, value, container)
+
+        await self._pause(page, self.timing.field_pause_ms)
+
+    async def _select2(self, page, field: str, label: str, value: str, container_selector: str = None):
+        budget = self.timing.budget(field)
+        try:
+            # Find the Select2 container
+            select_container = container_selector or SELECT2_CONTAINER.format(label=label)
+            container = await page.wait_for_selector(select_container, timeout=budget)
+
+            # Click to open dropdown
+            await page.click(select_container)
+            if self.timing.wait_for_ready_signals:
+                await page.wait_for_selector(SELECT2_RESULTS, state='visible', timeout=budget)
+            await self._pause(page, self.timing.select2_open_ms)
+
+            # Try to find and click the option
+            option = SELECT2_OPTION.format(value=value)
+            await page.wait_for_selector(option, timeout=budget)
+            await page.click(option)
+
+            if self.timing.wait_for_ready_signals:
+                await page.wait_for_function("([el, value]) => el.textContent.includes(value)",
+                                             arg=[container, value], timeout=budget)
+
+        except Exception as e:
+            logger.error(f"Failed to select {label}: {str(e)}")
+            FILL_FALLBACKS_TOTAL.labels(path='select2_script').inc()
+            try:
+                # Try alternative method using JavaScript
+                await page.evaluate("""([fieldName, value]) => {
+                    const select = Array.from(document.querySelectorAll('select'))
+                        .find(s => Array.from(s.options).some(opt => opt.text.includes(value)));
+                    if (select) {
+                        const option = Array.from(select.options).find(opt => opt.text.includes(value));
+                        if (option) {
+                            select.value = option.value;
+                            select.dispatchEvent(new Event('change', { bubbles: true }));
+                            if (window.jQuery) {
+                                jQuery(select).trigger('change.select2');
+                            }
+                        }
+                    }
+                }""", [label, value])
+            except Exception as e:
+                logger.error(f"Alternative selection for {label} failed: {str(e)}")
+
+    async def capture_screenshot(self, page, reason: str):
+        """Save a verification screenshot without letting a failure mask the fill result."""
+        try:
+            with timed(FILL_STAGE_SECONDS, stage='screenshot'):
+                path = await self.screenshots.capture(page, reason)
+            logger.info(f"Screenshot saved to: {path}")
+        except Exception as e:
+            logger.error(f"Failed to take {reason} screenshot: {str(e)}")
+
+    async def _pause(self, page, ms: int):
+        if ms:
+            await page.wait_for_timeout(ms)
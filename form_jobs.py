@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from governor import BusyError, ResourceBudget
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class FormJob:
+    """A single form-fill submission and its current status."""
+
+    def __init__(self, chat_id, user_data, job_id=None, status=QUEUED, attempts=0,
+                 created_at=None, updated_at=None, result_url=None, method=None, error=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.chat_id = chat_id
+        self.user_data = user_data
+        self.status = status
+        self.attempts = attempts
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+        self.result_url = result_url
+        self.method = method
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'chat_id': self.chat_id,
+            'user_data': self.user_data,
+            'status': self.status,
+            'attempts': self.attempts,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'result_url': self.result_url,
+            'method': self.method,
+            'error': self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FormJob":
+        return cls(
+            chat_id=data['chat_id'],
+            user_data=data['user_data'],
+            job_id=data['id'],
+            status=data['status'],
+            attempts=data.get('attempts', 0),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at'),
+            result_url=data.get('result_url'),
+            method=data.get('method'),
+            error=data.get('error'),
+        )
+
+
+class JobStore:
+    """JSON file holding every job record, rewritten atomically after each change.
+
+    The file is written from a worker thread so the event loop never waits on
+    disk I/O. Changes made while a write is in flight are coalesced into the
+    next one.
+
+    Finished jobs keep their status and result but drop the user's details,
+    and only the most recent ``max_finished`` of them are retained.
+    """
+
+    def __init__(self, path, max_finished=500):
+        self.path = Path(path)
+        self.max_finished = max_finished
+        self.jobs = {}
+        self._lock = asyncio.Lock()
+        self._dirty = False
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                self.jobs = {data['id']: FormJob.from_dict(data) for data in json.load(f)}
+        except Exception as e:
+            logger.error(f"Error loading job store {self.path}: {str(e)}")
+
+    async def save(self, job: FormJob):
+        """Record ``job`` and return once the file includes it."""
+        job.updated_at = time.time()
+        if job.status in (SUCCEEDED, FAILED):
+            job.user_data = None
+        self.jobs[job.id] = job
+        self._prune()
+        self._dirty = True
+        async with self._lock:
+            if not self._dirty:
+                # Written by the save that held the lock before us
+                return
+            self._dirty = False
+            records = [j.to_dict() for j in self.jobs.values()]
+            try:
+                await asyncio.to_thread(self._write, records)
+            except Exception as e:
+                logger.error(f"Error saving job store {self.path}: {str(e)}")
+
+    def _write(self, records: list):
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.path)
+
+    def pending(self) -> list:
+        """Jobs that were queued or running when the store was last written."""
+        jobs = [j for j in self.jobs.values() if j.status in (QUEUED, RUNNING)]
+        return sorted(jobs, key=lambda j: j.created_at)
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.status in (SUCCEEDED, FAILED)]
+        if len(finished) <= self.max_finished:
+            return
+        finished.sort(key=lambda j: j.updated_at)
+        for job in finished[:len(finished) - self.max_finished]:
+            del self.jobs[job.id]
+
+
+class FormJobQueue:
+    """Runs form fills in the background on a pool of worker tasks.
+
+    ``fill`` is awaited with the job's user data and returns a dict with the
+    resulting ``url`` and the ``method`` used (``browser`` or ``direct``), or
+    ``None`` on failure. ``notify`` is awaited with the job and an event name
+    (``queued``, ``started``, ``retrying``, ``succeeded``, ``failed`` or
+    ``busy``) so the caller can tell the user what is happening.
+
+    Jobs are admitted against ``budget``, which bounds concurrent fills, the
+    backlog and jobs per chat; without one, ``max_concurrent_fills`` fills run
+    at once and the backlog is unbounded.
+    """
+
+    def __init__(self, fill, notify, store: JobStore, workers=2, max_concurrent_fills=2,
+                 max_attempts=3, retry_delay=5.0, budget: ResourceBudget = None):
+        self.fill = fill
+        self.notify = notify
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.budget = budget or ResourceBudget('fill', max_concurrent_fills)
+        self._queue = None
+        self._queued_at = {}
+        self._tasks = []
+
+    async def start(self):
+        """Start the workers and re-queue jobs that survived a restart."""
+        self._queue = asyncio.Queue()
+        self.store.load()
+        pending = self.store.pending()
+        if pending:
+            logger.info(f"Resuming {len(pending)} form job(s) from {self.store.path}")
+        for job in pending:
+            job.status = QUEUED
+            await self.store.save(job)
+            self.budget.admit(job.chat_id, force=True)
+            self._enqueue(job)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers. Unfinished jobs stay persisted and resume on next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, chat_id, user_data: dict) -> FormJob:
+        """Persist and enqueue a new job, returning immediately.
+
+        Raises ``BusyError`` if the budget has no room for it.
+        """
+        self.budget.admit(chat_id)
+        job = FormJob(chat_id, user_data)
+        await self.store.save(job)
+        self._enqueue(job)
+        await self._notify(job, 'queued')
+        return job
+
+    def stats(self) -> dict:
+        statuses = [j.status for j in self.store.jobs.values()]
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'running': statuses.count(RUNNING),
+            'succeeded': statuses.count(SUCCEEDED),
+            'failed': statuses.count(FAILED),
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Form job worker {index} error on job {job.id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _enqueue(self, job: FormJob):
+        self._queued_at[job.id] = time.monotonic()
+        self._queue.put_nowait(job)
+
+    async def _run(self, job: FormJob):
+        queued_at = self._queued_at.pop(job.id, time.monotonic())
+        try:
+            while True:
+                # Time spent in the job queue counts against the budget's wait timeout,
+                # so a job that waited too long for a worker is shed even if a slot is free
+                timeout = None
+                if self.budget.wait_timeout is not None:
+                    timeout = self.budget.wait_timeout - (time.monotonic() - queued_at)
+                try:
+                    await self.budget.acquire(timeout)
+                except BusyError:
+                    logger.warning(f"Form job {job.id} waited too long for a fill slot, shedding it")
+                    job.status = FAILED
+                    job.error = "busy"
+                    await self.store.save(job)
+                    await self._notify(job, 'busy')
+                    return
+
+                try:
+                    job.status = RUNNING
+                    job.attempts += 1
+                    await self.store.save(job)
+                    await self._notify(job, 'started')
+                    try:
+                        result = await self.fill(job.user_data) or {}
+                        job.result_url = result.get('url')
+                        job.method = result.get('method')
+                        job.error = None if job.result_url else "Form could not be filled"
+                    except Exception as e:
+                        job.result_url = None
+                        job.error = str(e)
+                finally:
+                    self.budget.done()
+
+                if job.result_url:
+                    job.status = SUCCEEDED
+                    await self.store.save(job)
+                    await self._notify(job, 'succeeded')
+                    return
+
+                if job.attempts >= self.max_attempts:
+                    logger.error(f"Form job {job.id} failed after {job.attempts} attempt(s): {job.error}")
+                    job.status = FAILED
+                    await self.store.save(job)
+                    await self._notify(job, 'failed')
+                    return
+
+                logger.warning(f"Form job {job.id} attempt {job.attempts} failed, retrying: {job.error}")
+                job.status = QUEUED
+                await self.store.save(job)
+                await self._notify(job, 'retrying')
+                await asyncio.sleep(self.retry_delay * job.attempts)
+                queued_at = time.monotonic()
+        finally:
+            self.budget.release(job.chat_id)
+
+    async def _notify(self, job: FormJob, event: str):
+        try:
+            await self.notify(job, event)
+        except Exception as e:
+            logger.error(f"Error notifying chat {job.chat_id} about job {job.id}: {str(e)}")
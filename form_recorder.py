@@ -1,10 +1,11 @@
 from playwright.sync_api import sync_playwright
-import json
 import logging
 import time
 from datetime import datetime
 import os
+from collections import deque
 from pathlib import Path
+from jsonl_writer import JsonlWriter, recover
 
 # Configure logging
 logging.basicConfig(
@@ -13,60 +14,175 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Buffers click/input/focus/blur events in a fixed-size ring and hands them to
+# ``reportInteractions`` in batches: every ``flush_ms``, once ``batch_size``
+# events are waiting, and on ``beforeunload``/``pagehide``. Consecutive input
+# events on the same element collapse into the latest one. If Python falls
+# behind and the ring fills, the oldest events are dropped and counted.
+INTERACTION_BUFFER_SCRIPT = """
+    (() => {
+        const capacity = %(capacity)d;
+        const ring = new Array(capacity);
+        let head = 0;
+        let size = 0;
+        let dropped = 0;
+        let lastInput = null;
+
+        function push(event) {
+            if (size === capacity) {
+                head = (head + 1) %% capacity;
+                size--;
+                dropped++;
+                lastInput = null;
+            }
+            ring[(head + size) %% capacity] = event;
+            size++;
+        }
+
+        function flush() {
+            if (!size || !window.reportInteractions) return;
+            const batch = [];
+            while (size) {
+                batch.push(ring[head]);
+                ring[head] = undefined;
+                head = (head + 1) %% capacity;
+                size--;
+            }
+            lastInput = null;
+            window.reportInteractions(batch, dropped);
+            dropped = 0;
+        }
+
+        function getXPath(element) {
+            if (!element || element.nodeType !== 1) return '';
+            if (element.id !== '')
+                return 'id("' + element.id + '")';
+            if (element === document.body)
+                return element.tagName;
+
+            var ix = 0;
+            var siblings = element.parentNode ? element.parentNode.childNodes : [];
+            for (var i = 0; i < siblings.length; i++) {
+                var sibling = siblings[i];
+                if (sibling === element)
+                    return getXPath(element.parentNode) + '/' + element.tagName + '[' + (ix + 1) + ']';
+                if (sibling.nodeType === 1 && sibling.tagName === element.tagName)
+                    ix++;
+            }
+            return '';
+        }
+
+        function record(type, e) {
+            const element = e.target;
+            if (!element || element.nodeType !== 1) return;
+            const details = {
+                tagName: element.tagName,
+                id: element.id,
+                className: element.className,
+                type: element.type,
+                name: element.name,
+                xpath: getXPath(element)
+            };
+            if (type === 'click' || type === 'input') details.value = element.value;
+            if (type === 'click') {
+                details.text = (element.textContent || '').trim().slice(0, 200);
+                if (element.type === 'radio' || element.type === 'checkbox') details.checked = element.checked;
+                // Ties clicks inside a Select2 widget to the select it drives
+                const widget = element.closest('.select2-container');
+                const open = Array.from(document.querySelectorAll('.select2-container--open'))
+                    .find(c => c.previousElementSibling && c.previousElementSibling.tagName === 'SELECT');
+                const container = widget && widget.previousElementSibling && widget.previousElementSibling.tagName === 'SELECT'
+                    ? widget : (widget || element.closest('.select2-results__option')) && open;
+                if (container) details.select2 = container.previousElementSibling.id;
+            }
+            const event = {type, details, timestamp: new Date().toISOString()};
+
+            if (type === 'input' && lastInput && lastInput.element === element) {
+                // Replace the buffered keystroke with the element's latest value
+                lastInput.event.details = details;
+                lastInput.event.timestamp = event.timestamp;
+                lastInput.event.coalesced = (lastInput.event.coalesced || 1) + 1;
+                return;
+            }
+            push(event);
+            lastInput = type === 'input' ? {element, event} : null;
+            if (size >= %(batch_size)d) flush();
+        }
+
+        for (const type of ['click', 'input', 'focus', 'blur']) {
+            window.addEventListener(type, e => record(type, e), true);
+        }
+        setInterval(flush, %(flush_ms)d);
+        window.addEventListener('beforeunload', flush);
+        window.addEventListener('pagehide', flush);
+        window.flushInteractions = flush;
+    })();
+"""
+
 class FormRecorder:
-    def __init__(self):
-        self.interactions = []
+    def __init__(self, recent_limit=1000, buffer_capacity=1000, batch_size=50, flush_interval=0.5):
+        self.buffer_capacity = buffer_capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped_count = 0
+        # Only the latest interactions stay in memory; the full session is in the JSONL log
+        self.interactions = deque(maxlen=recent_limit)
+        self.interaction_count = 0
         self.form_url = "https://www.ocbc.com/personal-banking/forms/overseas-property-loan-enquiry"
         self.session_id = int(time.time())
         self.backup_dir = Path("recorded_interactions")
         self.backup_dir.mkdir(exist_ok=True)
-        self.current_file = self.backup_dir / f"form_interactions_{self.session_id}.json"
-        self.backup_count = 0
-        
-        # Create initial empty file
-        self.save_interactions(initial=True)
+        self.recover_sessions()
+        self.log = JsonlWriter(self.backup_dir, f"form_interactions_{self.session_id}")
+        self.current_file = self.log.index_path
     
-    def record_interaction(self, interaction_type, selector=None, value=None, details=None):
+    def recover_sessions(self):
+        """Write the index of any earlier session that was killed before it could close its log."""
+        for first_segment in self.backup_dir.glob("form_interactions_*_interactions_0001.jsonl*"):
+            prefix = first_segment.name.split('_interactions_0001')[0]
+            if (self.backup_dir / f"{prefix}_index.json").exists():
+                continue
+            try:
+                index_path = recover(self.backup_dir, prefix)
+                logger.info(f"Recovered interrupted session log {index_path}")
+            except Exception as e:
+                logger.error(f"Error recovering session {prefix}: {str(e)}")
+
+    def record_interaction(self, interaction_type, selector=None, value=None, details=None, timestamp=None):
         """Record a user interaction with the form."""
         interaction = {
             'type': interaction_type,
             'selector': selector,
             'value': value,
             'details': details,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp or datetime.now().isoformat()
         }
         self.interactions.append(interaction)
-        logger.info(f"Recorded interaction: {interaction}")
+        self.interaction_count += 1
+        logger.debug(f"Recorded interaction: {interaction}")
         
-        # Save after every 5 interactions
-        self.backup_count += 1
-        if self.backup_count >= 5:
-            self.save_interactions()
-            self.backup_count = 0
+        # Appended by the log's writer thread, which flushes on a size or time threshold
+        self.log.write('interactions', interaction)
     
-    def save_interactions(self, initial=False):
-        """Save recorded interactions to a file."""
+    def record_batch(self, events, dropped=0):
+        """Record a batch of events flushed by the in-page buffer."""
+        for event in events:
+            details = event.get('details')
+            if event.get('coalesced'):
+                details = {**details, 'coalesced': event['coalesced']}
+            self.record_interaction(event.get('type'), None, None, details, timestamp=event.get('timestamp'))
+        if dropped:
+            self.dropped_count += dropped
+            logger.warning(f"Page buffer overflowed, {dropped} interaction(s) were dropped")
+        logger.info(f"Recorded {len(events)} interaction(s), {self.interaction_count} in total")
+
+    def save_interactions(self):
+        """Flush the interaction log and write its index."""
         try:
-            if initial:
-                data = []
-            else:
-                data = self.interactions
-            
-            with open(self.current_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            
-            if not initial:
-                logger.info(f"Saved {len(data)} interactions to {self.current_file}")
+            self.log.close({'session_id': self.session_id, 'form_url': self.form_url})
+            logger.info(f"Saved {self.interaction_count} interactions to {self.current_file}")
         except Exception as e:
             logger.error(f"Error saving interactions: {str(e)}")
-            # Try to save to a backup file
-            backup_file = self.backup_dir / f"form_interactions_{self.session_id}_backup_{int(time.time())}.json"
-            try:
-                with open(backup_file, 'w') as f:
-                    json.dump(data, f, indent=2)
-                logger.info(f"Saved backup to {backup_file}")
-            except Exception as e2:
-                logger.error(f"Failed to save backup: {str(e2)}")
     
     def start_recording(self):
         """Start recording user interactions with the form."""
@@ -83,84 +199,15 @@ class FormRecorder:
             page.on("input", lambda e: self.record_interaction("input", None, None, str(e)))
             page.on("change", lambda e: self.record_interaction("change", None, None, str(e)))
             
-            # Add more detailed event listeners using JavaScript
-            page.add_init_script("""
-                window.addEventListener('click', function(e) {
-                    const element = e.target;
-                    const details = {
-                        tagName: element.tagName,
-                        id: element.id,
-                        className: element.className,
-                        type: element.type,
-                        name: element.name,
-                        value: element.value,
-                        xpath: getXPath(element)
-                    };
-                    window.reportInteraction('click', details);
-                }, true);
-
-                window.addEventListener('input', function(e) {
-                    const element = e.target;
-                    const details = {
-                        tagName: element.tagName,
-                        id: element.id,
-                        className: element.className,
-                        type: element.type,
-                        name: element.name,
-                        value: element.value,
-                        xpath: getXPath(element)
-                    };
-                    window.reportInteraction('input', details);
-                }, true);
-
-                // Add focus and blur events
-                window.addEventListener('focus', function(e) {
-                    const element = e.target;
-                    const details = {
-                        tagName: element.tagName,
-                        id: element.id,
-                        className: element.className,
-                        type: element.type,
-                        name: element.name,
-                        xpath: getXPath(element)
-                    };
-                    window.reportInteraction('focus', details);
-                }, true);
-
-                window.addEventListener('blur', function(e) {
-                    const element = e.target;
-                    const details = {
-                        tagName: element.tagName,
-                        id: element.id,
-                        className: element.className,
-                        type: element.type,
-                        name: element.name,
-                        xpath: getXPath(element)
-                    };
-                    window.reportInteraction('blur', details);
-                }, true);
-
-                function getXPath(element) {
-                    if (element.id !== '')
-                        return 'id("' + element.id + '")';
-                    if (element === document.body)
-                        return element.tagName;
-
-                    var ix = 0;
-                    var siblings = element.parentNode.childNodes;
-                    for (var i = 0; i < siblings.length; i++) {
-                        var sibling = siblings[i];
-                        if (sibling === element)
-                            return getXPath(element.parentNode) + '/' + element.tagName + '[' + (ix + 1) + ']';
-                        if (sibling.nodeType === 1 && sibling.tagName === element.tagName)
-                            ix++;
-                    }
-                }
-            """)
+            # Events are buffered in the page and delivered in batches
+            page.add_init_script(INTERACTION_BUFFER_SCRIPT % {
+                'capacity': self.buffer_capacity,
+                'batch_size': self.batch_size,
+                'flush_ms': int(self.flush_interval * 1000),
+            })
             
-            # Expose function to receive events from JavaScript
-            page.expose_function("reportInteraction", 
-                lambda type, details: self.record_interaction(type, None, None, details))
+            # Expose function to receive event batches from JavaScript
+            page.expose_function("reportInteractions", self.record_batch)
             
             # Navigate to form
             logger.info("Navigating to form...")
@@ -192,6 +239,13 @@ class FormRecorder:
             except Exception as e:
                 logger.error(f"Recording error: {str(e)}")
             finally:
+                # Deliver whatever is still buffered in the page
+                try:
+                    page.evaluate("() => window.flushInteractions && window.flushInteractions()")
+                    page.wait_for_timeout(200)
+                except Exception as e:
+                    logger.error(f"Error flushing buffered interactions: {str(e)}")
+                
                 # Take final screenshot
                 try:
                     page.screenshot(path=str(screenshots_dir / f"form_final_{self.session_id}.png"))
@@ -206,7 +260,9 @@ class FormRecorder:
                 except Exception as e:
                     logger.error(f"Error closing browser: {str(e)}")
                 
-                logger.info(f"\nRecording session completed. Total interactions: {len(self.interactions)}")
+                logger.info(f"\nRecording session completed. Total interactions: {self.interaction_count}")
+                if self.dropped_count:
+                    logger.warning(f"{self.dropped_count} interaction(s) were dropped by the page buffer")
                 logger.info(f"Interactions saved to: {self.current_file}")
                 logger.info(f"Screenshots saved in: {screenshots_dir}/")
 
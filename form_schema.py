@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from jsonl_writer import load_records
+from config import FORM_FIELDS, SALUTATION_OPTIONS, BEST_TIME_OPTIONS, NATURE_ENQUIRY_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+# Collects every input, select and textarea on the page in the same shape as
+# the ``allElements`` map saved by FormAnalyzer.save_current_state (minus
+# values and XPaths). Radios are keyed per value so no option is lost.
+ELEMENTS_SCRIPT = """() => {
+    const allElements = {};
+    document.querySelectorAll('input, select, textarea').forEach(element => {
+        const key = element.id || (element.type === 'radio' ? `${element.name}:${element.value}` : element.name);
+        if (!key) return;
+        const attributes = {};
+        for (const attr of element.attributes) attributes[attr.name] = attr.value;
+        allElements[key] = {
+            type: element.type,
+            id: element.id,
+            name: element.name,
+            className: typeof element.className === 'string' ? element.className : '',
+            tagName: element.tagName,
+            attributes,
+        };
+        if (element.type === 'select-one') {
+            allElements[key].options = Array.from(element.options).map(opt => ({ text: opt.text, value: opt.value }));
+        }
+    });
+    return allElements;
+}"""
+
+REQUIRED_FIELDS = ('salutation', 'full_name', 'contact', 'email', 'best_time', 'nature_enquiry')
+SKIPPED_INPUT_TYPES = {'hidden', 'submit', 'button', 'reset', 'image', 'checkbox', 'file'}
+# Words looked for in an input's placeholder, aria-label, name, id and autocomplete
+TEXT_FIELD_HINTS = {
+    'email': ('email',),
+    'contact': ('contact', 'phone', 'mobile', 'tel'),
+    'full_name': ('name',),
+}
+SELECT_FIELD_OPTIONS = {
+    'best_time': BEST_TIME_OPTIONS,
+    'nature_enquiry': NATURE_ENQUIRY_OPTIONS,
+}
+
+
+def fingerprint(all_elements: dict) -> str:
+    """Hash of the form's structure: control tags, types, ids, names and select options.
+
+    Values are ignored so a half-filled form has the same fingerprint, and
+    radios collapse to their group so FormAnalyzer output and a live page agree.
+    """
+    parts = set()
+    for element in all_elements.values():
+        options = tuple(opt.get('text', '').strip() for opt in element.get('options') or [])
+        if element.get('type') == 'radio':
+            parts.add(('INPUT', 'radio', '', element.get('name') or '', ()))
+        else:
+            parts.add((element.get('tagName') or '', element.get('type') or '',
+                       element.get('id') or '', element.get('name') or '', options))
+    return hashlib.sha256(json.dumps(sorted(parts)).encode()).hexdigest()[:16]
+
+
+def css_string(value: str) -> str:
+    """Escape ``value`` for use inside a double-quoted CSS attribute selector."""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class FormSchema:
+    """Field-to-selector index for the enquiry form, tied to the form's fingerprint.
+
+    ``fields`` has the same shape as ``config.FORM_FIELDS`` (``type`` plus
+    ``name`` for the radio group or ``id`` otherwise), with exact CSS
+    selectors and, for selects, the option texts.
+    """
+
+    def __init__(self, fields: dict, fingerprint: str, url: str = None, extracted_at: float = None):
+        self.fields = fields
+        self.fingerprint = fingerprint
+        self.url = url
+        self.extracted_at = extracted_at or time.time()
+
+    @classmethod
+    def from_elements(cls, all_elements: dict, url: str = None) -> "FormSchema":
+        """Map FormAnalyzer-style ``allElements`` onto the bot's form fields.
+
+        Ids and names from ``config.FORM_FIELDS`` are used when they are still
+        on the page; otherwise fields are matched by input type, hint words
+        and select option texts. Fields that can't be matched are left out.
+        """
+        elements = [e for e in all_elements.values() if e.get('type') not in SKIPPED_INPUT_TYPES]
+        fields = {}
+
+        radios = [e for e in elements if e.get('type') == 'radio' and e.get('name')]
+        known = FORM_FIELDS['salutation']['name']
+        group = known if any(e['name'] == known for e in radios) else next(
+            (e['name'] for e in radios if (e.get('attributes') or {}).get('value') in SALUTATION_OPTIONS), None)
+        if group:
+            fields['salutation'] = {
+                'type': 'radio',
+                'name': group,
+                'selector': f'input[type="radio"][name="{css_string(group)}"]',
+            }
+
+        by_id = {e['id']: e for e in elements if e.get('id')}
+        unclaimed = [e for e in elements if e.get('id') and e.get('type') != 'radio']
+        for field in ('email', 'contact', 'full_name', 'best_time', 'nature_enquiry'):
+            element = by_id.get(FORM_FIELDS[field]['id'])
+            if element is None:
+                if field in SELECT_FIELD_OPTIONS:
+                    element = cls._match_select(unclaimed, SELECT_FIELD_OPTIONS[field])
+                else:
+                    element = cls._match_text(unclaimed, field)
+            if element is None:
+                continue
+            unclaimed = [e for e in unclaimed if e is not element]
+            selector = f'[id="{css_string(element["id"])}"]'
+            if element.get('tagName') == 'SELECT':
+                fields[field] = {
+                    'type': 'select2',
+                    'id': element['id'],
+                    'selector': selector,
+                    # Select2 inserts its container right after the original select
+                    'container': f'{selector} + .select2-container',
+                    'options': [opt.get('text', '').strip() for opt in element.get('options') or []],
+                }
+            else:
+                fields[field] = {'type': 'text', 'id': element['id'], 'selector': selector}
+
+        return cls(fields, fingerprint(all_elements), url=url)
+
+    @staticmethod
+    def _match_text(elements: list, field: str):
+        for element in elements:
+            if element.get('tagName') not in ('INPUT', 'TEXTAREA'):
+                continue
+            attrs = element.get('attributes') or {}
+            hints = ' '.join([attrs.get('placeholder', ''), attrs.get('aria-label', ''), element.get('name') or '',
+                              element.get('id') or '', attrs.get('autocomplete', '')]).lower()
+            if field == 'email' and element.get('type') == 'email':
+                return element
+            if field == 'contact' and element.get('type') == 'tel':
+                return element
+            if any(word in hints for word in TEXT_FIELD_HINTS[field]):
+                return element
+        return None
+
+    @staticmethod
+    def _match_select(elements: list, expected_options: list):
+        best, best_overlap = None, 0
+        for element in elements:
+            if element.get('tagName') != 'SELECT':
+                continue
+            texts = {opt.get('text', '').strip() for opt in element.get('options') or []}
+            overlap = len(texts & set(expected_options))
+            if overlap > best_overlap:
+                best, best_overlap = element, overlap
+        return best
+
+    @property
+    def missing(self) -> list:
+        return [field for field in REQUIRED_FIELDS if field not in self.fields]
+
+    def selector(self, field: str, value: str = None) -> str:
+        """Exact selector for ``field``; for the radio group, the option with ``value``."""
+        selector = self.fields[field]['selector']
+        if self.fields[field]['type'] == 'radio' and value is not None:
+            selector += f'[value="{css_string(value)}"]'
+        return selector
+
+    def to_dict(self) -> dict:
+        return {
+            'fingerprint': self.fingerprint,
+            'url': self.url,
+            'extracted_at': self.extracted_at,
+            'fields': self.fields,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FormSchema":
+        return cls(data['fields'], data['fingerprint'], url=data.get('url'), extracted_at=data.get('extracted_at'))
+
+    def save(self, path):
+        # Written atomically so a crash mid-write never leaves a broken cache; the
+        # temporary name is per process because browser workers share the file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "FormSchema":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class FormSchemaCache:
+    """Keeps the form schema on disk and re-extracts it when the live form changes.
+
+    ``resolve`` reads the page's controls in one query and compares their
+    fingerprint with the cached schema's. On a mismatch the schema is
+    re-extracted from the same snapshot and saved; if the new form can't be
+    fully mapped, ``None`` is returned so the filler falls back to its
+    heuristic selectors.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.schema = None
+        self.hits = 0
+        self.extractions = 0
+        self.drifts = 0
+        self.failures = 0
+
+    def load(self):
+        if not self.path.exists():
+            logger.info(f"No form schema cached at {self.path}, it will be extracted on the first fill")
+            return
+        try:
+            self.schema = FormSchema.load(self.path)
+            logger.info(f"Loaded form schema {self.schema.fingerprint} from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading form schema {self.path}: {str(e)}")
+
+    async def resolve(self, page):
+        """Return the schema matching the form on ``page``, or ``None`` if it can't be mapped."""
+        try:
+            all_elements = await page.evaluate(ELEMENTS_SCRIPT)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error reading the form's controls: {str(e)}")
+            return None
+        current = fingerprint(all_elements)
+        if self.schema and self.schema.fingerprint == current:
+            self.hits += 1
+            return self.schema
+
+        schema = FormSchema.from_elements(all_elements, url=page.url)
+        if schema.missing:
+            self.failures += 1
+            logger.error(f"Form {current} could not be mapped, missing {schema.missing}")
+            return None
+
+        if self.schema:
+            self.drifts += 1
+            logger.warning(f"Form changed ({self.schema.fingerprint} -> {current}), re-extracted its schema")
+        self.extractions += 1
+        self.schema = schema
+        try:
+            await asyncio.to_thread(schema.save, self.path)
+        except Exception as e:
+            logger.error(f"Error saving form schema {self.path}: {str(e)}")
+        return schema
+
+    def stats(self) -> dict:
+        return {
+            'cached': self.schema is not None,
+            'hits': self.hits,
+            'extractions': self.extractions,
+            'drifts': self.drifts,
+            'failures': self.failures,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the form schema from FormAnalyzer output")
+    parser.add_argument('capture', help="form_analysis_*_index.json written by form_analyzer.py "
+                                        "(or a single saved form state JSON)")
+    parser.add_argument('-o', '--output', default='form_schema.json')
+    args = parser.parse_args()
+
+    states = load_records(args.capture, 'state')
+    state = states[-1] if isinstance(states, list) else states
+    schema = FormSchema.from_elements(state['allElements'], url=state.get('url'))
+    if schema.missing:
+        logger.warning(f"Could not map {schema.missing}; the bot will re-extract on its first fill")
+    schema.save(args.output)
+    logger.info(f"Form schema {schema.fingerprint} saved to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
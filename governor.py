@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class BusyError(Exception):
+    """Raised when a budget sheds work instead of queueing it."""
+
+    def __init__(self, budget: str, reason: str):
+        super().__init__(f"{budget} budget exhausted ({reason})")
+        self.budget = budget
+        self.reason = reason
+
+
+class ResourceBudget:
+    """Admission control for one kind of expensive work (browser fills, LLM calls).
+
+    At most ``capacity`` holders run at once and at most ``max_waiting`` more
+    are admitted to wait for a slot; each user can have ``per_user_limit``
+    admitted at a time. Work that can't be admitted, or that waits longer than
+    ``wait_timeout`` seconds for a slot, is rejected with ``BusyError``.
+    ``None`` disables a limit.
+    """
+
+    def __init__(self, name, capacity, max_waiting=None, wait_timeout=None, per_user_limit=None):
+        self.name = name
+        self.capacity = capacity
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.per_user_limit = per_user_limit
+        self._slots = asyncio.Semaphore(capacity)
+        self._per_user = {}
+        self.admitted = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = {'per_user': 0, 'queue_full': 0, 'timeout': 0}
+
+    @property
+    def waiting(self) -> int:
+        return self.admitted - self.active
+
+    def admit(self, user_id=None, force=False):
+        """Count new work against the budget without waiting, or raise ``BusyError``.
+
+        ``force`` skips the limits, for work that was accepted before a restart.
+        """
+        if not force:
+            if self.per_user_limit and user_id is not None and \
+                    self._per_user.get(user_id, 0) >= self.per_user_limit:
+                self._reject('per_user')
+            if self.max_waiting is not None and self.admitted >= self.capacity + self.max_waiting:
+                self._reject('queue_full')
+        self.admitted += 1
+        if user_id is not None:
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+    def release(self, user_id=None):
+        """Remove admitted work from the budget once it has finished or been shed."""
+        self.admitted -= 1
+        if user_id is not None:
+            remaining = self._per_user.get(user_id, 0) - 1
+            if remaining > 0:
+                self._per_user[user_id] = remaining
+            else:
+                self._per_user.pop(user_id, None)
+
+    async def acquire(self, timeout=None):
+        """Wait for a run slot for admitted work; ``timeout`` defaults to ``wait_timeout``.
+
+        A timeout of zero or less means the work already waited too long
+        elsewhere and is rejected even if a slot is free.
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        if timeout is not None and timeout <= 0:
+            self._reject('timeout')
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._reject('timeout')
+        self.active += 1
+
+    def done(self):
+        """Give back a run slot taken with ``acquire``."""
+        self.active -= 1
+        self.completed += 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self, user_id=None):
+        """Admit, wait for a slot and hold it for the duration of the block."""
+        self.admit(user_id)
+        try:
+            await self.acquire()
+            try:
+                yield
+            finally:
+                self.done()
+        finally:
+            self.release(user_id)
+
+    def stats(self) -> dict:
+        return {
+            'capacity': self.capacity,
+            'active': self.active,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected': dict(self.rejected),
+        }
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        logger.warning(f"Shedding {self.name} work: {reason}")
+        raise BusyError(self.name, reason)
@@ -0,0 +1,218 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class JsonlWriter:
+    """Appends JSON records to per-stream JSONL files from a background thread.
+
+    ``write`` only enqueues, so callers on a busy loop never wait on disk.
+    Each stream is written to numbered segments
+    (``<prefix>_<stream>_0001.jsonl``). A new segment starts once the current
+    one reaches ``max_bytes``, and with ``compress`` finished segments are
+    gzipped. ``close`` drains the queue and writes ``<prefix>_index.json``
+    listing every stream's segments and record counts.
+
+    Segments are flushed once ``flush_bytes`` are buffered or
+    ``flush_interval`` seconds have passed, so a crash loses at most that much;
+    ``recover`` rebuilds the index of a writer that never closed. At most
+    ``max_pending`` records wait in memory; beyond that ``write`` blocks until
+    the thread catches up.
+    """
+
+    def __init__(self, directory, prefix: str, max_bytes=50 * 1024 * 1024, compress=False,
+                 flush_interval=1.0, flush_bytes=64 * 1024, max_pending=10000):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.streams = {}
+        self._files = {}
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._created_at = time.time()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"jsonl-writer-{prefix}", daemon=True)
+        self._thread.start()
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / f"{self.prefix}_index.json"
+
+    def write(self, stream: str, record: dict):
+        """Queue ``record`` for appending to ``stream``; records written after ``close`` are dropped."""
+        if self._closed:
+            return
+        self._queue.put((stream, record))
+
+    def close(self, extra: dict = None) -> Path:
+        """Write out everything queued, close the segments and write the index.
+
+        ``extra`` is merged into the index, e.g. paths of related artifacts.
+        """
+        if self._closed:
+            return self.index_path
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+        _write_index(self.index_path, {
+            'prefix': self.prefix,
+            'created_at': self._created_at,
+            'closed_at': time.time(),
+            'streams': self.streams,
+            **(extra or {}),
+        })
+        return self.index_path
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush()
+                continue
+            if item is _CLOSE:
+                break
+            stream, record = item
+            try:
+                self._append(stream, record)
+            except Exception as e:
+                logger.error(f"Error writing {stream} record: {str(e)}")
+
+        for stream in list(self._files):
+            self._finish_segment(stream)
+
+    def _append(self, stream: str, record: dict):
+        info = self.streams.setdefault(stream, {'records': 0, 'bytes': 0, 'segments': []})
+        handle = self._files.get(stream)
+        if handle is None:
+            path = self.directory / f"{self.prefix}_{stream}_{len(info['segments']) + 1:04d}.jsonl"
+            handle = self._files[stream] = open(path, 'w')
+            info['segments'].append(path.name)
+
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        handle.write(line)
+        info['records'] += 1
+        info['bytes'] += len(line)
+        self._unflushed += len(line)
+        if handle.tell() >= self.max_bytes:
+            self._finish_segment(stream)
+        elif self._unflushed >= self.flush_bytes or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._flush()
+
+    def _finish_segment(self, stream: str):
+        handle = self._files.pop(stream)
+        handle.close()
+        if not self.compress:
+            return
+        path = Path(handle.name)
+        try:
+            with open(path, 'rb') as src, gzip.open(f"{path}.gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            path.unlink()
+            segments = self.streams[stream]['segments']
+            segments[segments.index(path.name)] = f"{path.name}.gz"
+        except Exception as e:
+            logger.error(f"Error compressing {path}: {str(e)}")
+
+    def _flush(self):
+        for handle in self._files.values():
+            handle.flush()
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+
+def _write_index(path: Path, index: dict):
+    # Written atomically so readers never see a half-written index
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def recover(directory, prefix: str) -> Path:
+    """Rebuild the index of a writer that was killed before ``close``.
+
+    Segments found on disk are listed in order; a partially written last
+    line (the record being appended at the crash) is cut off the plain-text
+    segment so the log can be replayed.
+    """
+    directory = Path(directory)
+    streams = {}
+    segment_names = sorted(p.name for p in directory.glob(f"{prefix}_*_[0-9][0-9][0-9][0-9].jsonl*"))
+    for name in segment_names:
+        stream = name[len(prefix) + 1:].split('.')[0].rsplit('_', 1)[0]
+        info = streams.setdefault(stream, {'records': 0, 'bytes': 0, 'segments': []})
+        path = directory / name
+        if not name.endswith('.gz'):
+            with open(path, 'rb+') as f:
+                data = f.read()
+                complete = data[:data.rfind(b'\n') + 1]
+                if len(complete) != len(data):
+                    logger.warning(f"Dropping a partial record at the end of {name}")
+                    f.truncate(len(complete))
+        records = 0
+        size = 0
+        try:
+            for record in _read_jsonl(path):
+                records += 1
+                size += len(json.dumps(record, separators=(',', ':'), default=str)) + 1
+        except Exception as e:
+            logger.error(f"Error reading {name}, keeping {records} record(s): {str(e)}")
+        info['records'] += records
+        info['bytes'] += size
+        info['segments'].append(name)
+
+    index_path = directory / f"{prefix}_index.json"
+    _write_index(index_path, {
+        'prefix': prefix,
+        'created_at': None,
+        'closed_at': None,
+        'recovered_at': time.time(),
+        'streams': streams,
+    })
+    return index_path
+
+
+def _read_jsonl(path):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_stream(index_path, stream: str):
+    """Yield the records of ``stream`` across all segments listed in a writer index."""
+    index_path = Path(index_path)
+    with open(index_path) as f:
+        index = json.load(f)
+    for segment in index['streams'].get(stream, {}).get('segments', []):
+        yield from _read_jsonl(index_path.parent / segment)
+
+
+def load_records(path, stream: str = None):
+    """Load records from a writer index (``stream`` required), a JSONL segment or a plain JSON file."""
+    path = str(path)
+    if path.endswith('_index.json'):
+        return list(read_stream(path, stream))
+    if path.endswith(('.jsonl', '.jsonl.gz')):
+        return list(_read_jsonl(path))
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,72 @@
+import asyncio
+import importlib
+import logging
+import time
+from metrics import LLM_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """Shared non-blocking OpenAI chat client.
+
+    All calls go through one pooled HTTP client. Concurrency is bounded by the
+    caller's admission budget (``llm_budget`` in the bot), not here. The OpenAI
+    SDK is imported and the client built on the first call or ``warm()``, off
+    the event loop.
+    """
+
+    def __init__(self, api_key: str, model: str = "gpt-4o", timeout: float = 30.0,
+                 max_connections: int = 20):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.client = None
+        self._client_lock = asyncio.Lock()
+        self.in_flight = 0
+
+    async def warm(self):
+        """Import the SDK and build the pooled client if that hasn't happened yet."""
+        async with self._client_lock:
+            if self.client is not None:
+                return
+            # The SDK takes a noticeable fraction of a second to import
+            httpx, openai = await asyncio.to_thread(
+                lambda: (importlib.import_module('httpx'), importlib.import_module('openai'))
+            )
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout
+            )
+            self.client = openai.AsyncOpenAI(api_key=self.api_key, http_client=http_client, timeout=self.timeout)
+
+    async def complete(self, system_prompt: str, user_message: str,
+                       temperature: float = 0.7, timeout: float = None) -> str:
+        """Return the assistant reply for a single-turn conversation."""
+        if self.client is None:
+            await self.warm()
+        self.in_flight += 1
+        outcome = 'error'
+        start = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message}
+                ],
+                temperature=temperature,
+                timeout=timeout or self.timeout
+            )
+            outcome = 'ok'
+        finally:
+            self.in_flight -= 1
+            LLM_REQUEST_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - start)
+        return response.choices[0].message.content
+
+    async def close(self):
+        """Close the pooled HTTP client."""
+        if self.client is not None:
+            await self.client.close()
@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+from telegram import Update
+from telegram.request import BaseRequest
+from bot import OCBCLoanBot
+from config import (
+    BUSY_MESSAGE, FORM_JOB_WORKERS, FORM_JOB_MAX_CONCURRENT_FILLS,
+    FILL_BUDGET_MAX_WAITING, FILL_BUDGET_WAIT_TIMEOUT, FILL_BUDGET_PER_USER, PERSISTENCE_UPDATE_INTERVAL
+)
+from form_jobs import FormJobQueue, JobStore
+from governor import ResourceBudget
+from persistence import SQLitePersistence
+from proc_stats import percentile
+
+logger = logging.getLogger(__name__)
+
+LOAD_TEST_TOKEN = "123456:LOAD-TEST"
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Kelvin', 'username': 'load_test_bot'}
+
+# One conversation: (step name, kind, payload, bot messages the step should produce)
+CONVERSATION = [
+    ('start', 'command', '/start', 1),
+    ('initial_name', 'text', 'Jane', 1),
+    ('initial_question', 'text', 'What are the rates for a London property loan?', 2),
+    ('ask_for_contact', 'text', 'yes', 1),
+    ('salutation', 'callback', 'Ms', 1),
+    ('full_name', 'text', 'Jane Tan', 1),
+    ('contact', 'text', '+6591234567', 1),
+    ('email', 'text', 'jane.tan@example.com', 1),
+    ('best_time', 'callback', '9am - 1pm', 1),
+    ('nature_enquiry', 'callback', 'London Property Financing', 1),
+    ('submit', 'text', 'submit', 1),
+]
+# Job progress notices sent between 'submit' and the final outcome
+PROGRESS_PREFIXES = ('⏳', '🔄')
+BUSY_TEXT = BUSY_MESSAGE.strip().splitlines()[0]
+
+
+def _jittered(latency_ms: float, jitter: float) -> float:
+    return max(0.0, latency_ms * (1 + random.uniform(-jitter, jitter))) / 1000
+
+
+class StubTelegramRequest(BaseRequest):
+    """Answers Bot API calls locally after a simulated round trip.
+
+    Every ``sendMessage`` is routed to the waiting virtual user for its chat.
+    """
+
+    def __init__(self, latency_ms=50, jitter=0.2):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.calls = {}
+        self._inboxes = {}
+        self._message_id = 0
+
+    def inbox(self, chat_id: int) -> asyncio.Queue:
+        return self._inboxes.setdefault(chat_id, asyncio.Queue())
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        await asyncio.sleep(_jittered(self.latency_ms, self.jitter))
+        endpoint = urlparse(url).path.rsplit('/', 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        params = request_data.parameters if request_data else {}
+
+        if endpoint == 'getMe':
+            result = BOT_USER
+        elif endpoint == 'sendMessage':
+            chat_id = int(params['chat_id'])
+            self._message_id += 1
+            result = {
+                'message_id': self._message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': BOT_USER,
+                'text': params.get('text', ''),
+            }
+            self.inbox(chat_id).put_nowait(result['text'])
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+class StubLLM:
+    """Stands in for ``LLMClient`` with a fixed, jittered completion latency."""
+
+    def __init__(self, latency_ms=1500, jitter=0.3):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.calls = 0
+
+    async def complete(self, system_prompt: str, user_message: str, temperature: float = 0.7,
+                       timeout: float = None) -> str:
+        self.calls += 1
+        await asyncio.sleep(_jittered(self.latency_ms, self.jitter))
+        return "OCBC offers overseas property loans in several markets. A specialist can share current rates."
+
+    async def warm(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class LoadTestBot(OCBCLoanBot):
+    """``OCBCLoanBot`` with the form fill replaced by a simulated one."""
+
+    def __init__(self, llm, request, persistence=None, fill_latency_ms=8000, fill_jitter=0.3, fill_failure_rate=0.0):
+        super().__init__(token=LOAD_TEST_TOKEN, llm=llm, request=request, persistence=persistence)
+        self.fill_latency_ms = fill_latency_ms
+        self.fill_jitter = fill_jitter
+        self.fill_failure_rate = fill_failure_rate
+
+    async def submit_form(self, user_data: dict) -> dict:
+        await asyncio.sleep(_jittered(self.fill_latency_ms, self.fill_jitter))
+        if random.random() < self.fill_failure_rate:
+            return None
+        return {'url': 'https://example.com/form', 'method': 'browser'}
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that asked to sleep ``interval`` seconds."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected) * 1000)
+
+
+class VirtualUser:
+    """Drives one chat through ``CONVERSATION`` and records per-step latency."""
+
+    def __init__(self, user_id: int, application, request: StubTelegramRequest, updates,
+                 think_ms=0, step_timeout=60.0, fill_timeout=600.0, wait_for_fill=True):
+        self.user_id = user_id
+        self.application = application
+        self.inbox = request.inbox(user_id)
+        self.updates = updates
+        self.think_ms = think_ms
+        self.step_timeout = step_timeout
+        self.fill_timeout = fill_timeout
+        self.wait_for_fill = wait_for_fill
+        self.latencies = {}
+        self.shed = []
+        self.error = None
+        self._message_id = 0
+
+    async def run(self):
+        step = None
+        try:
+            for step, kind, payload, replies in CONVERSATION:
+                if self.think_ms:
+                    await asyncio.sleep(_jittered(self.think_ms, 0.5))
+                start = time.perf_counter()
+                await self.application.update_queue.put(self._update(kind, payload))
+                texts = await self._receive(replies, self.step_timeout)
+                self.latencies[step] = (time.perf_counter() - start) * 1000
+                if any(BUSY_TEXT in text for text in texts):
+                    self.shed.append(step)
+                    if step == 'submit':
+                        return
+            if self.wait_for_fill:
+                step = 'fill'
+                start = time.perf_counter()
+                while True:
+                    text = (await self._receive(1, self.fill_timeout))[0]
+                    if not text.startswith(PROGRESS_PREFIXES):
+                        break
+                self.latencies['fill'] = (time.perf_counter() - start) * 1000
+                if BUSY_TEXT in text:
+                    self.shed.append(step)
+        except Exception as e:
+            self.error = f"{step}: {type(e).__name__} {str(e)}"
+
+    async def _receive(self, count: int, timeout: float) -> list:
+        return [await asyncio.wait_for(self.inbox.get(), timeout) for _ in range(count)]
+
+    def _update(self, kind: str, payload: str) -> Update:
+        self._message_id += 1
+        user = {'id': self.user_id, 'is_bot': False, 'first_name': f'User{self.user_id}'}
+        chat = {'id': self.user_id, 'type': 'private'}
+        message = {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': chat,
+            'from': user,
+            'text': payload,
+        }
+        if kind == 'command':
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(payload)}]
+        if kind == 'callback':
+            data = {'callback_query': {
+                'id': f'{self.user_id}-{self._message_id}',
+                'from': user,
+                'chat_instance': str(self.user_id),
+                'data': payload,
+                'message': {**message, 'from': BOT_USER, 'text': 'Please choose:'},
+            }}
+        else:
+            data = {'message': message}
+        data['update_id'] = next(self.updates)
+        return Update.de_json(data, self.application.bot)
+
+
+def _distribution(values: list) -> dict:
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50), 1),
+        'p95': round(percentile(values, 95), 1),
+        'p99': round(percentile(values, 99), 1),
+        'max': round(max(values), 1) if values else 0.0,
+    }
+
+
+async def run_load_test(args) -> dict:
+    request = StubTelegramRequest(latency_ms=args.telegram_latency_ms)
+    llm = StubLLM(latency_ms=args.llm_latency_ms)
+    store_dir = tempfile.mkdtemp(prefix='load_test_')
+    # Conversation state goes through the same write-behind persistence as in production
+    persistence = SQLitePersistence(os.path.join(store_dir, 'bot_state.db'), update_interval=PERSISTENCE_UPDATE_INTERVAL)
+    bot = LoadTestBot(llm, request, persistence=persistence, fill_latency_ms=args.fill_latency_ms,
+                      fill_failure_rate=args.fill_failure_rate)
+    bot.fill_budget = ResourceBudget(
+        'fill',
+        capacity=args.fill_workers,
+        max_waiting=args.fill_max_waiting,
+        wait_timeout=FILL_BUDGET_WAIT_TIMEOUT,
+        per_user_limit=FILL_BUDGET_PER_USER
+    )
+    bot.form_jobs = FormJobQueue(
+        fill=bot.submit_form,
+        notify=bot.notify_job,
+        store=JobStore(os.path.join(store_dir, 'form_jobs.json')),
+        workers=args.fill_workers,
+        max_attempts=1,
+        budget=bot.fill_budget
+    )
+    application = bot.app
+    updates = iter(range(1, 10 ** 9))
+    users = [
+        VirtualUser(100000 + index, application, request, updates, think_ms=args.think_ms,
+                    step_timeout=args.step_timeout, wait_for_fill=not args.skip_fill)
+        for index in range(args.users)
+    ]
+
+    await application.initialize()
+    await bot.form_jobs.start()
+    await application.start()
+    lag = LoopLagMonitor()
+    lag.start()
+    started = time.perf_counter()
+    try:
+        async def launch(index, user):
+            if args.ramp_seconds:
+                await asyncio.sleep(args.ramp_seconds * index / len(users))
+            await user.run()
+
+        await asyncio.gather(*(launch(i, u) for i, u in enumerate(users)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await lag.stop()
+        await application.stop()
+        await bot.form_jobs.stop()
+        await application.shutdown()
+
+    steps = [step for step, *_ in CONVERSATION] + ([] if args.skip_fill else ['fill'])
+    completed = [u for u in users if u.error is None and not {'submit', 'fill'} & set(u.shed)]
+    shed = {}
+    for user in users:
+        for step in user.shed:
+            shed[step] = shed.get(step, 0) + 1
+    handled = sum(len(u.latencies) for u in users) - sum(1 for u in users if 'fill' in u.latencies)
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'settings': {k: v for k, v in vars(args).items() if k != 'output'},
+        'elapsed_seconds': round(elapsed, 3),
+        'conversations_completed': len(completed),
+        'conversations_failed': sum(1 for u in users if u.error),
+        'conversations_shed': len(users) - len(completed) - sum(1 for u in users if u.error),
+        'shed_by_step': shed,
+        'conversations_per_second': round(len(completed) / elapsed, 3) if elapsed else 0.0,
+        'updates_per_second': round(handled / elapsed, 3) if elapsed else 0.0,
+        'step_latency_ms': {
+            step: _distribution([u.latencies[step] for u in users if step in u.latencies])
+            for step in steps
+        },
+        'event_loop_lag_ms': _distribution(lag.samples),
+        'bot_api_calls': request.calls,
+        'llm_calls': llm.calls,
+        'update_processor': bot.update_processor.stats(),
+        'llm_budget': bot.llm_budget.stats(),
+        'fill_budget': bot.fill_budget.stats(),
+        'persistence': persistence.stats(),
+        'errors': [u.error for u in users if u.error][:20],
+    }
+
+
+def print_report(report: dict):
+    print(f"Conversations: {report['conversations_completed']} completed, "
+          f"{report['conversations_shed']} shed, {report['conversations_failed']} failed "
+          f"in {report['elapsed_seconds']} s")
+    if report['shed_by_step']:
+        print(f"Busy replies by step: {report['shed_by_step']}")
+    print(f"Throughput: {report['conversations_per_second']} conversations/s, "
+          f"{report['updates_per_second']} updates/s")
+    header = f"{'step':<18} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['step_latency_ms'].items()) + [('event loop lag', report['event_loop_lag_ms'])]
+    for name, d in rows:
+        print(f"{name:<18} {d['count']:>6} {d['p50']:>9} {d['p95']:>9} {d['p99']:>9} {d['max']:>9}")
+    for error in report['errors']:
+        print(f"error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated Telegram users through the bot's conversation flow")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--ramp-seconds', type=float, default=5.0, help="spread user start times over this window")
+    parser.add_argument('--think-ms', type=float, default=500, help="average pause between a user's messages")
+    parser.add_argument('--telegram-latency-ms', type=float, default=50, help="simulated Bot API round trip")
+    parser.add_argument('--llm-latency-ms', type=float, default=1500, help="simulated OpenAI completion time")
+    parser.add_argument('--fill-latency-ms', type=float, default=8000, help="simulated form fill time")
+    parser.add_argument('--fill-failure-rate', type=float, default=0.0)
+    parser.add_argument('--fill-workers', type=int, default=max(FORM_JOB_WORKERS, FORM_JOB_MAX_CONCURRENT_FILLS))
+    parser.add_argument('--fill-max-waiting', type=int, default=FILL_BUDGET_MAX_WAITING,
+                        help="fill jobs admitted beyond the running ones before users get a busy reply")
+    parser.add_argument('--step-timeout', type=float, default=60.0, help="seconds to wait for the bot's reply")
+    parser.add_argument('--skip-fill', action='store_true', help="don't wait for the fill to finish")
+    parser.add_argument('--output', help="results file (default: bench_results/load_test_<timestamp>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+
+    output = Path(args.output or f"bench_results/load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+// Minimal stand-in for Select2 with the same DOM classes the filler relies on:
+// a .select2-container after each select.select2 that opens a list of
+// li.select2-results__option items and mirrors the select's value.
+(function () {
+    function render(select, container) {
+        const option = select.options[select.selectedIndex];
+        container.querySelector('.select2-selection__rendered').textContent = option ? option.text : '';
+    }
+
+    function close(container) {
+        const dropdown = container.querySelector('.select2-dropdown');
+        if (dropdown) dropdown.remove();
+        container.classList.remove('select2-container--open');
+    }
+
+    function open(select, container) {
+        // Results render asynchronously, like Select2's AJAX/data adapters
+        setTimeout(function () {
+            const dropdown = document.createElement('div');
+            dropdown.className = 'select2-dropdown';
+            const list = document.createElement('ul');
+            list.className = 'select2-results__options';
+            Array.from(select.options).forEach(function (option) {
+                if (!option.value) return;
+                const item = document.createElement('li');
+                item.className = 'select2-results__option';
+                item.textContent = option.text;
+                item.addEventListener('click', function (e) {
+                    e.stopPropagation();
+                    select.value = option.value;
+                    select.dispatchEvent(new Event('change', { bubbles: true }));
+                    close(container);
+                });
+                list.appendChild(item);
+            });
+            dropdown.appendChild(list);
+            container.appendChild(dropdown);
+            container.classList.add('select2-container--open');
+        }, 50);
+    }
+
+    function init(select) {
+        const container = document.createElement('div');
+        container.className = 'select2 select2-container';
+        const rendered = document.createElement('span');
+        rendered.className = 'select2-selection__rendered';
+        container.appendChild(rendered);
+        select.insertAdjacentElement('afterend', container);
+        container.addEventListener('click', function () {
+            if (container.classList.contains('select2-container--open')) {
+                close(container);
+            } else {
+                open(select, container);
+            }
+        });
+        select.addEventListener('change', function () { render(select, container); });
+        render(select, container);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select.select2').forEach(init);
+    });
+})();
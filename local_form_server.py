@@ -0,0 +1,143 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FORM_DIR = Path(__file__).parent / "local_form"
+
+# Dynamic assets served on top of the static files in local_form/
+WEIGHT_ASSET = '/assets/weight.js'
+ASSET_ALIASES = {
+    '/': 'index.html',
+    '/assets/form.css': 'form.css',
+    '/assets/select2-lite.js': 'select2-lite.js',
+}
+SUBMIT_PATH = '/api/enquiry'
+
+
+class _FormRequestHandler(SimpleHTTPRequestHandler):
+    """Serves the replica form with artificial latency and a padded script asset."""
+
+    def __init__(self, *args, server_config=None, **kwargs):
+        self.server_config = server_config
+        super().__init__(*args, directory=str(FORM_DIR), **kwargs)
+
+    def do_GET(self):
+        self._delay()
+        path = self.path.split('?', 1)[0]
+        if path == WEIGHT_ASSET:
+            body = self._weight_script()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/javascript')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path in ASSET_ALIASES:
+            self.path = '/' + ASSET_ALIASES[path]
+        super().do_GET()
+
+    def do_POST(self):
+        self._delay()
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self.path.split('?', 1)[0] != SUBMIT_PATH:
+            self.send_error(404)
+            return
+        self.server_config['submissions'] += 1
+        body = json.dumps({'status': 'ok'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def end_headers(self):
+        # Static assets are cacheable, like the real form's bundles
+        if self.command == 'GET' and self.path.endswith(('.css', '.js')):
+            self.send_header('Cache-Control', 'public, max-age=3600')
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _delay(self):
+        latency_ms = self.server_config['latency_ms']
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def _weight_script(self) -> bytes:
+        # A comment block sized to asset_kb stands in for a heavy JS bundle
+        padding = '/*' + 'x' * max(0, self.server_config['asset_kb'] * 1024 - 4) + '*/'
+        return (padding + '\nwindow.__assetWeightLoaded = true;\n').encode()
+
+
+class LocalFormServer:
+    """Local HTTP server for the replica form in ``local_form/``.
+
+    ``latency_ms`` is added to every request and ``asset_kb`` sets the size of
+    a cacheable script the page loads, so network cost can be dialled in.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, asset_kb=200):
+        self.host = host
+        self.port = port
+        self.config = {'latency_ms': latency_ms, 'asset_kb': asset_kb, 'submissions': 0}
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self._server.server_address[1]}/"
+
+    @property
+    def submit_url(self) -> str:
+        return self.url.rstrip('/') + SUBMIT_PATH
+
+    def start(self):
+        handler = partial(_FormRequestHandler, server_config=self.config)
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Local form served at {self.url}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the local replica of the loan enquiry form")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency-ms', type=int, default=0, help="artificial delay added to every request")
+    parser.add_argument('--asset-kb', type=int, default=200, help="size of the padded script asset")
+    args = parser.parse_args()
+
+    server = LocalFormServer(port=args.port, latency_ms=args.latency_ms, asset_kb=args.asset_kb).start()
+    print(f"Serving the local form at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
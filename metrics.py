@@ -0,0 +1,79 @@
+import functools
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+
+# Buckets from 5 ms up to 2 minutes: covers single DOM operations through full fills
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+FILL_STAGE_SECONDS = Histogram(
+    'form_fill_stage_seconds', 'Time spent in each stage of a form fill', ['stage'],
+    buckets=LATENCY_BUCKETS
+)
+FILL_FIELD_SECONDS = Histogram(
+    'form_fill_field_seconds', 'Time spent filling each form field', ['field'],
+    buckets=LATENCY_BUCKETS
+)
+FILLS_TOTAL = Counter(
+    'form_fills_total', 'Completed form submissions by outcome and method', ['outcome', 'method']
+)
+FILL_FALLBACKS_TOTAL = Counter(
+    'form_fill_fallbacks_total', 'Times a fill had to take a fallback path', ['path']
+)
+HANDLER_SECONDS = Histogram(
+    'conversation_handler_seconds', 'Time spent in each conversation state handler', ['handler'],
+    buckets=LATENCY_BUCKETS
+)
+LLM_REQUEST_SECONDS = Histogram(
+    'llm_request_seconds', 'OpenAI completion latency by outcome', ['outcome'],
+    buckets=LATENCY_BUCKETS
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observe the duration of the ``with`` block on ``histogram``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+def instrument_handler(callback):
+    """Wrap a conversation handler so its latency is recorded under its name."""
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        with timed(HANDLER_SECONDS, handler=callback.__name__):
+            return await callback(update, context)
+    return wrapper
+
+
+class StatsCollector:
+    """Exports a component stats snapshot, e.g. ``OCBCLoanBot.stats()``, as gauges.
+
+    ``{'browser_pool': {'idle': 2}}`` becomes ``ocbc_bot_browser_pool_idle 2.0``;
+    nested dicts become one gauge with a ``key`` label.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def collect(self):
+        for component, values in self.stats().items():
+            for key, value in values.items():
+                name = f"ocbc_bot_{component}_{key}"
+                description = f"{component.replace('_', ' ')} {key.replace('_', ' ')}"
+                if isinstance(value, dict):
+                    gauge = GaugeMetricFamily(name, description, labels=['key'])
+                    for label, item in value.items():
+                        gauge.add_metric([str(label)], float(item))
+                    yield gauge
+                elif isinstance(value, (int, float)):
+                    yield GaugeMetricFamily(name, description, value=float(value))
+
+
+def render_metrics():
+    """Return the Prometheus text exposition of all registered metrics and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS data (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, key)
+);
+CREATE TABLE IF NOT EXISTS chat_locks (
+    chat_id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def shard_for(chat_id: int, shard_count: int) -> int:
+    """Replica index that owns ``chat_id`` when chats are split across ``shard_count`` replicas."""
+    return chat_id % shard_count if shard_count > 1 else 0
+
+
+class SQLitePersistence(BasePersistence):
+    """Stores user data, chat data and conversation states in a SQLite database shared by replicas.
+
+    Updates from the application are staged in memory, where repeated writes
+    to one key collapse into the latest value, and written in one transaction
+    per batch from a worker thread every ``flush_interval`` seconds (or as
+    soon as ``batch_size`` keys are pending).
+
+    Each replica only loads the chats of its shard. Every write also takes a
+    lease on its chat in ``chat_locks``; writes to a chat leased by another
+    live replica are dropped and counted as conflicts, so a misrouted chat
+    can't overwrite its owner's state. Leases last ``lock_ttl`` seconds, by
+    default three update cycles, and are released on shutdown, so a new owner
+    after a reshard or failover takes over within seconds.
+
+    User data is sharded and leased by user id, which is only the id of the
+    chat serving that user in private chats; the bot only holds conversations
+    in private chats for this reason.
+    """
+
+    def __init__(self, path, owner='shard-0', shard_index=0, shard_count=1, update_interval=2.0,
+                 flush_interval=0.5, batch_size=500, lock_ttl=None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.path = str(path)
+        self.owner = owner
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.lock_ttl = lock_ttl or 3 * (update_interval + flush_interval)
+
+        self._db = None
+        self._pending = {}
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+        self._batch_ready = asyncio.Event()
+
+        self.batches = 0
+        self.writes = 0
+        self.conflicts = 0
+        self.errors = 0
+
+    def _connect(self):
+        if self._db is None:
+            # Only used from one thread at a time, under _flush_lock or during start-up
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _owned(self, chat_id: int) -> bool:
+        return shard_for(chat_id, self.shard_count) == self.shard_index
+
+    def _load_data(self, kind: str) -> dict:
+        rows = self._connect().execute("SELECT id, value FROM data WHERE kind = ?", (kind,)).fetchall()
+        return {row[0]: json.loads(row[1]) for row in rows if self._owned(row[0])}
+
+    def _load_conversations(self, name: str) -> dict:
+        rows = self._connect().execute("SELECT key, chat_id, state FROM conversations WHERE name = ?",
+                                       (name,)).fetchall()
+        return {tuple(json.loads(row[0])): json.loads(row[2]) for row in rows if self._owned(row[1])}
+
+    async def get_user_data(self) -> dict:
+        data = await asyncio.to_thread(self._load_data, 'user')
+        logger.info(f"Loaded user data for {len(data)} user(s) of shard {self.shard_index}")
+        return data
+
+    async def get_chat_data(self) -> dict:
+        return await asyncio.to_thread(self._load_data, 'chat')
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        conversations = await asyncio.to_thread(self._load_conversations, name)
+        logger.info(f"Restored {len(conversations)} '{name}' conversation(s) of shard {self.shard_index}")
+        return conversations
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        self._stage(('conversation', name, tuple(key)), new_state)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._stage(('user', user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._stage(('chat', chat_id), data)
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage(('user', user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage(('chat', chat_id), None)
+
+    # A chat is only served by the replica of its shard, so the in-memory copy
+    # is authoritative and doesn't need re-reading before each update
+    async def refresh_user_data(self, user_id: int, user_data) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Write everything still pending and close the database; called when the application stops."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self._flush()
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._release_leases)
+            except Exception as e:
+                logger.error(f"Error releasing chat leases of {self.owner}: {str(e)}")
+            await asyncio.to_thread(self._db.close)
+            self._db = None
+
+    def _release_leases(self):
+        self._db.execute("DELETE FROM chat_locks WHERE owner = ?", (self.owner,))
+
+    def _stage(self, key: tuple, value):
+        # None deletes the row
+        self._pending[key] = value
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._flush()
+
+    async def _flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                denied = await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error writing {len(batch)} persistence update(s), will retry: {str(e)}")
+                for key, value in batch.items():
+                    # Keep anything staged since; it is newer than the failed write
+                    self._pending.setdefault(key, value)
+                return
+            self.batches += 1
+            self.writes += len(batch) - denied
+            if denied:
+                self.conflicts += denied
+                logger.warning(f"Dropped {denied} update(s) for chats leased by another replica")
+
+    @staticmethod
+    def _chat_of(key: tuple) -> int:
+        # User data is keyed by user id, the same as the chat id in a private chat
+        return key[2][0] if key[0] == 'conversation' else key[1]
+
+    def _write(self, batch: dict) -> int:
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            denied_chats = set()
+            for chat_id in {self._chat_of(key) for key in batch}:
+                row = db.execute("SELECT owner, expires_at FROM chat_locks WHERE chat_id = ?", (chat_id,)).fetchone()
+                if row and row[0] != self.owner and row[1] > now:
+                    denied_chats.add(chat_id)
+                    continue
+                db.execute(
+                    "INSERT INTO chat_locks (chat_id, owner, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(chat_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                    (chat_id, self.owner, now + self.lock_ttl)
+                )
+
+            denied = 0
+            for key, value in batch.items():
+                chat_id = self._chat_of(key)
+                if chat_id in denied_chats:
+                    denied += 1
+                    continue
+                if key[0] == 'conversation':
+                    name, conversation_key = key[1], json.dumps(list(key[2]))
+                    if value is None:
+                        db.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, conversation_key))
+                    else:
+                        db.execute(
+                            "INSERT INTO conversations (name, key, chat_id, state, owner, updated_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name, key) DO UPDATE SET "
+                            "state = excluded.state, owner = excluded.owner, updated_at = excluded.updated_at",
+                            (name, conversation_key, chat_id, json.dumps(value), self.owner, now)
+                        )
+                elif value is None:
+                    db.execute("DELETE FROM data WHERE kind = ? AND id = ?", key)
+                else:
+                    db.execute(
+                        "INSERT INTO data (kind, id, value, owner, updated_at) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(kind, id) DO UPDATE SET "
+                        "value = excluded.value, owner = excluded.owner, updated_at = excluded.updated_at",
+                        (key[0], key[1], json.dumps(value, default=str), self.owner, now)
+                    )
+            db.execute("COMMIT")
+            return denied
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> dict:
+        return {
+            'pending': len(self._pending),
+            'batches': self.batches,
+            'writes': self.writes,
+            'conflicts': self.conflicts,
+            'errors': self.errors,
+        }
@@ -0,0 +1,83 @@
+import asyncio
+import os
+from pathlib import Path
+
+
+class ProcessTreeSampler:
+    """Samples RSS and CPU time of this process and all its descendants (Chromium included).
+
+    Reads ``/proc`` directly, so it only reports on Linux; elsewhere the
+    figures stay at zero.
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak_rss = 0
+        self._task = None
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        self._clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    def start(self):
+        self.peak_rss = 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def cpu_seconds(self) -> float:
+        total = 0
+        for pid in self._tree():
+            stat = self._read_stat(pid)
+            if stat:
+                total += int(stat[11]) + int(stat[12])  # utime + stime
+        return total / self._clock_ticks
+
+    def rss_bytes(self) -> int:
+        total = 0
+        for pid in self._tree():
+            try:
+                with open(f'/proc/{pid}/statm') as f:
+                    total += int(f.read().split()[1]) * self._page_size
+            except (OSError, IndexError, ValueError):
+                pass
+        return total
+
+    async def _run(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, self.rss_bytes())
+            await asyncio.sleep(self.interval)
+
+    def _tree(self) -> list:
+        children = {}
+        for entry in Path('/proc').glob('[0-9]*'):
+            stat = self._read_stat(entry.name)
+            if stat:
+                children.setdefault(int(stat[1]), []).append(int(entry.name))
+        pids, queue = [], [os.getpid()]
+        while queue:
+            pid = queue.pop()
+            pids.append(pid)
+            queue.extend(children.get(pid, []))
+        return pids
+
+    @staticmethod
+    def _read_stat(pid):
+        """Fields of /proc/<pid>/stat after the command name (state, ppid, ...)."""
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                return f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            return None
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from jsonl_writer import load_records
+from form_schema import REQUIRED_FIELDS, css_string
+from config import FORM_FIELDS, OCBC_FORM_URL
+
+logger = logging.getLogger(__name__)
+
+# Select2 renders result options with ids like select2-<select id>-result-<key>-<value>
+SELECT2_RESULT_ID = re.compile(r'^select2-(.+)-result-[^-]+-')
+
+# Runs every step of a rendered plan in one round trip and returns a success
+# flag per step. Selectors are CSS, or XPath when prefixed with "xpath=".
+REPLAY_SCRIPT = """(steps) => {
+    const find = (selector) => selector.startsWith('xpath=')
+        ? document.evaluate(selector.slice(6), document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+        : document.querySelector(selector);
+    const fire = (el, ...types) => types.forEach(type => el.dispatchEvent(new Event(type, { bubbles: true })));
+    const setValue = (el, value) => {
+        // Use the prototype setter so framework-controlled inputs notice the change
+        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+    };
+
+    return steps.map(step => {
+        try {
+            if (step.action === 'fill') {
+                const input = find(step.selector);
+                if (!input || input.disabled || input.readOnly) return false;
+                input.focus();
+                setValue(input, step.value);
+                fire(input, 'input', 'change');
+                input.blur();
+                return input.value === step.value;
+            }
+            if (step.action === 'check') {
+                if (step.value !== undefined) {
+                    const radios = Array.from(document.querySelectorAll(step.selector));
+                    const radio = radios.find(r => r.value === step.value)
+                        || radios.find(r => Array.from(r.labels || []).some(l => l.textContent.trim() === step.value));
+                    if (!radio) return false;
+                    if (!radio.checked) radio.click();
+                    return radio.checked;
+                }
+                const box = find(step.selector);
+                if (!box) return false;
+                if (box.checked !== step.checked) box.click();
+                return box.checked === step.checked;
+            }
+            if (step.action === 'select') {
+                const select = find(step.selector);
+                if (!select || !select.options) return false;
+                const options = Array.from(select.options);
+                const option = options.find(o => o.text.trim() === step.value)
+                    || options.find(o => o.value === step.value)
+                    || options.find(o => step.value && o.text.includes(step.value));
+                if (!option) return false;
+                select.value = option.value;
+                if (window.jQuery) {
+                    // Updates Select2's rendered selection and runs jQuery-bound handlers
+                    window.jQuery(select).trigger('change');
+                } else {
+                    fire(select, 'input', 'change');
+                }
+                return select.value === option.value;
+            }
+            if (step.action === 'click') {
+                const el = find(step.selector);
+                if (!el) return false;
+                el.click();
+                return true;
+            }
+        } catch (e) {
+            console.error(`Replay step ${step.action} ${step.selector} failed: ${e}`);
+        }
+        return false;
+    });
+}"""
+
+
+def stable_selector(details: dict) -> str:
+    """Selector for a recorded element: its id, then its name, then the recorded XPath."""
+    if details.get('id'):
+        return f'[id="{css_string(details["id"])}"]'
+    tag = (details.get('tagName') or '').lower()
+    if details.get('name') and tag:
+        return f'{tag}[name="{css_string(details["name"])}"]'
+    if details.get('xpath'):
+        return f"xpath={details['xpath']}"
+    return None
+
+
+class ReplayPlan:
+    """Minimal list of steps that reproduces a recorded form session.
+
+    Each step has an ``action`` (``fill``, ``check``, ``select`` or ``click``),
+    a ``selector`` and, where it sets a value, the ``value`` to set. Steps that
+    set one of the bot's form fields carry ``field`` and a ``{{field}}``
+    placeholder as their value, filled in from ``user_data`` by ``render``.
+    """
+
+    def __init__(self, url: str, steps: list, compiled_at: float = None, source: str = None):
+        self.url = url
+        self.steps = steps
+        self.compiled_at = compiled_at or time.time()
+        self.source = source
+
+    @classmethod
+    def from_recording(cls, interactions: list, url: str, sample_values: dict = None,
+                       include_submit=False, source: str = None) -> "ReplayPlan":
+        """Compile FormRecorder interactions into a plan.
+
+        Focus/blur events and clicks that only move focus or open a dropdown
+        are dropped, keystrokes collapse into one ``fill`` per element and
+        repeated choices keep only the last one. Values are tied to form
+        fields by the ids in ``config.FORM_FIELDS`` or, failing that, by
+        matching ``sample_values`` (the values typed while recording);
+        values that match neither are left out. Submit button clicks are left out unless ``include_submit``.
+        """
+        steps = []
+        positions = {}
+
+        def set_step(key, step):
+            # The first occurrence fixes the position, the last one the value
+            if key in positions:
+                steps[positions[key]] = step
+            else:
+                positions[key] = len(steps)
+                steps.append(step)
+
+        for interaction in interactions:
+            details = interaction.get('details')
+            if not isinstance(details, dict):
+                continue
+            event = interaction.get('type')
+            tag = (details.get('tagName') or '').upper()
+            input_type = (details.get('type') or '').lower()
+            selector = stable_selector(details)
+
+            if event == 'input' and selector:
+                if tag == 'SELECT':
+                    set_step(selector, {'action': 'select', 'selector': selector, 'value': details.get('value', '')})
+                elif tag in ('INPUT', 'TEXTAREA') and input_type not in ('radio', 'checkbox'):
+                    set_step(selector, {'action': 'fill', 'selector': selector, 'value': details.get('value', '')})
+                continue
+            if event != 'click':
+                continue
+
+            select_id = details.get('select2')
+            if not select_id:
+                match = SELECT2_RESULT_ID.match(details.get('id') or '')
+                select_id = match.group(1) if match else None
+            if select_id:
+                # Clicks that open the dropdown are noise; the chosen option is what counts
+                if 'select2-results__option' in (details.get('className') or '') and details.get('text'):
+                    select_selector = f'[id="{css_string(select_id)}"]'
+                    set_step(select_selector, {'action': 'select', 'selector': select_selector,
+                                               'value': details['text']})
+                continue
+
+            if input_type == 'radio' and details.get('name'):
+                group = f'input[type="radio"][name="{css_string(details["name"])}"]'
+                set_step(group, {'action': 'check', 'selector': group, 'value': details.get('value', '')})
+            elif input_type in ('radio', 'checkbox') and selector:
+                previous = steps[positions[selector]]['checked'] if selector in positions else False
+                checked = details['checked'] if 'checked' in details else not previous
+                set_step(selector, {'action': 'check', 'selector': selector, 'checked': checked})
+            elif selector and (tag in ('BUTTON', 'A') or input_type in ('submit', 'button')):
+                if input_type == 'submit' or (tag == 'BUTTON' and input_type in ('', 'submit')):
+                    if not include_submit:
+                        continue
+                steps.append({'action': 'click', 'selector': selector})
+
+        steps = cls._assign_fields(steps, sample_values or {})
+        return cls(url, steps, source=source)
+
+    @staticmethod
+    def _assign_fields(steps: list, sample_values: dict) -> list:
+        """Tie value steps to form fields and return the steps to keep.
+
+        Value steps that can't be tied to a field are dropped: replaying them
+        would send the recording user's answers with every other user's data.
+        """
+        known = {}
+        for field, spec in FORM_FIELDS.items():
+            if spec['type'] == 'radio':
+                known[f'input[type="radio"][name="{css_string(spec["name"])}"]'] = field
+            else:
+                known[f'[id="{css_string(spec["id"])}"]'] = field
+
+        claimed = set()
+        for step in steps:
+            if step['action'] == 'click' or 'value' not in step:
+                continue
+            field = known.get(step['selector'])
+            if field is None:
+                value = str(step['value'])
+                field = next((f for f, sample in sample_values.items() if f not in claimed and sample and (
+                    value == sample or (step['action'] == 'select' and sample in value))), None)
+            if field is None or field in claimed:
+                continue
+            claimed.add(field)
+            step['field'] = field
+            step['value'] = ReplayPlan._placeholder(field)
+
+        kept = [step for step in steps if 'value' not in step or 'field' in step]
+        dropped = [step['selector'] for step in steps if 'value' in step and 'field' not in step]
+        if dropped:
+            logger.warning(f"Dropped {len(dropped)} recorded value(s) not tied to a form field: {dropped}")
+        return kept
+
+    @property
+    def fields(self) -> list:
+        return [step['field'] for step in self.steps if 'field' in step]
+
+    @property
+    def missing(self) -> list:
+        return [field for field in REQUIRED_FIELDS if field not in self.fields]
+
+    def render(self, user_data: dict) -> list:
+        """Return the steps with field placeholders replaced by ``user_data``.
+
+        Value steps without a field, as in plans compiled before they were
+        dropped at compile time, are skipped.
+        """
+        steps = []
+        for step in self.steps:
+            if 'value' in step and 'field' not in step:
+                continue
+            step = dict(step)
+            if 'field' in step:
+                step['value'] = str(user_data.get(step['field'], ''))
+            steps.append(step)
+        return steps
+
+    def to_dict(self) -> dict:
+        return {
+            'url': self.url,
+            'compiled_at': self.compiled_at,
+            'source': self.source,
+            'steps': self.steps,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReplayPlan":
+        return cls(data['url'], data['steps'], compiled_at=data.get('compiled_at'), source=data.get('source'))
+
+    def save(self, path):
+        # Written atomically so a crash mid-write never leaves a broken plan
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "ReplayPlan":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @staticmethod
+    def _placeholder(field: str) -> str:
+        return '{{' + field + '}}'
+
+
+class ReplayRunner:
+    """Executes a replay plan on a loaded form page in a single in-page script, without pauses."""
+
+    def __init__(self, plan: ReplayPlan, timeout_ms=10000):
+        self.plan = plan
+        self.timeout_ms = timeout_ms
+        self.runs = 0
+        self.failed_steps = 0
+
+    async def run(self, page, user_data: dict) -> dict:
+        """Replay the plan with ``user_data`` and return ``{field: success}`` for the plan's fields."""
+        steps = self.plan.render(user_data)
+        self.runs += 1
+        try:
+            if steps:
+                first = steps[0]['selector']
+                await page.wait_for_selector(first, state='attached', timeout=self.timeout_ms)
+            results = await page.evaluate(REPLAY_SCRIPT, steps)
+        except Exception as e:
+            logger.error(f"Replay failed: {str(e)}")
+            self.failed_steps += len(steps)
+            return {}
+
+        failed = [f"{step['action']} {step['selector']}" for step, ok in zip(steps, results) if not ok]
+        if failed:
+            self.failed_steps += len(failed)
+            logger.warning(f"Replay steps failed: {failed}")
+        return {step['field']: ok for step, ok in zip(steps, results) if 'field' in step}
+
+    def stats(self) -> dict:
+        return {
+            'steps': len(self.plan.steps),
+            'runs': self.runs,
+            'failed_steps': self.failed_steps,
+        }
+
+
+def _recording_url(path: str):
+    if not str(path).endswith('_index.json'):
+        return None
+    with open(path) as f:
+        return json.load(f).get('form_url')
+
+
+async def _run_plan(args):
+    from playwright.async_api import async_playwright
+
+    plan = ReplayPlan.load(args.plan)
+    user_data = dict(item.split('=', 1) for item in args.data)
+    runner = ReplayRunner(plan)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headed)
+        page = await browser.new_page()
+        try:
+            started = time.perf_counter()
+            await page.goto(args.url or plan.url, wait_until="domcontentloaded")
+            results = await runner.run(page, user_data)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Replayed {len(plan.steps)} step(s) in {elapsed:.2f}s: {results}")
+        finally:
+            await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile FormRecorder sessions into replay plans and run them")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = commands.add_parser('compile', help="build a replay plan from a recording")
+    compile_parser.add_argument('recording', help="form_interactions_*_index.json written by form_recorder.py "
+                                                  "(or a JSON list of interactions)")
+    compile_parser.add_argument('--sample', nargs='*', default=[], metavar='FIELD=VALUE',
+                                help="values typed into the form while recording, e.g. full_name='Jane Tan'")
+    compile_parser.add_argument('--url', help="form URL, if the recording doesn't name it")
+    compile_parser.add_argument('--include-submit', action='store_true', help="keep clicks on submit buttons")
+    compile_parser.add_argument('-o', '--output', default='replay_plan.json')
+
+    run_parser = commands.add_parser('run', help="replay a plan in a headless browser")
+    run_parser.add_argument('plan')
+    run_parser.add_argument('--data', nargs='+', required=True, metavar='FIELD=VALUE')
+    run_parser.add_argument('--url', help="override the plan's form URL")
+    run_parser.add_argument('--headed', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        asyncio.run(_run_plan(args))
+        return
+
+    interactions = load_records(args.recording, 'interactions')
+    url = args.url or _recording_url(args.recording) or OCBC_FORM_URL
+    sample_values = dict(item.split('=', 1) for item in args.sample)
+    plan = ReplayPlan.from_recording(interactions, url, sample_values,
+                                     include_submit=args.include_submit, source=str(args.recording))
+    if plan.missing:
+        logger.warning(f"The recording doesn't set {plan.missing}; the filler will fill them field by field")
+    plan.save(args.output)
+    logger.info(f"Replay plan with {len(plan.steps)} step(s) from {len(interactions)} interaction(s) "
+                f"saved to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
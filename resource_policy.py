@@ -0,0 +1,105 @@
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Nothing in these types is needed to fill the form or drive Select2
+DEFAULT_BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font', 'texttrack', 'manifest', 'eventsource', 'websocket')
+
+# Analytics, tag managers and ad networks that keep the page from reaching networkidle
+DEFAULT_BLOCKED_DOMAINS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'facebook.net',
+    'facebook.com',
+    'connect.facebook.net',
+    'adobedtm.com',
+    'omtrdc.net',
+    'demdex.net',
+    'everesttech.net',
+    'hotjar.com',
+    'licdn.com',
+    'linkedin.com',
+    'bing.com',
+    'analytics.tiktok.com',
+    'ads-twitter.com',
+    'criteo.com',
+    'taboola.com',
+    'newrelic.com',
+    'nr-data.net',
+)
+
+# Rough transfer sizes, used to estimate bytes saved by requests that were never made
+ESTIMATED_BYTES = {
+    'image': 40_000,
+    'media': 500_000,
+    'font': 35_000,
+    'script': 60_000,
+    'stylesheet': 20_000,
+    'xhr': 2_000,
+    'fetch': 2_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+
+class ResourcePolicy:
+    """Playwright routing policy that aborts requests the form fill doesn't need.
+
+    Decisions are made in this order: an allowed domain is always let through,
+    then blocked domains, allowed resource types and blocked resource types are
+    checked. Domains match themselves and any subdomain.
+    """
+
+    def __init__(self, blocked_resource_types=DEFAULT_BLOCKED_RESOURCE_TYPES,
+                 blocked_domains=DEFAULT_BLOCKED_DOMAINS, allowed_resource_types=(),
+                 allowed_domains=()):
+        self.blocked_resource_types = set(blocked_resource_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allowed_resource_types = set(allowed_resource_types)
+        self.allowed_domains = tuple(allowed_domains)
+
+        self.allowed_requests = 0
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.estimated_bytes_saved = 0
+
+    def allows(self, resource_type: str, url: str) -> bool:
+        host = urlsplit(url).hostname or ''
+        if self._matches(host, self.allowed_domains):
+            return True
+        if self._matches(host, self.blocked_domains):
+            return False
+        if resource_type in self.allowed_resource_types:
+            return True
+        return resource_type not in self.blocked_resource_types
+
+    async def install(self, target):
+        """Route every request of a page or browser context through the policy."""
+        await target.route("**/*", self._handle_route)
+
+    async def _handle_route(self, route):
+        request = route.request
+        if self.allows(request.resource_type, request.url):
+            self.allowed_requests += 1
+            # Hand over to the next route handler, or to the network
+            await route.fallback()
+            return
+
+        self.blocked_requests += 1
+        self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+        self.estimated_bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+        await route.abort('blockedbyclient')
+
+    def stats(self) -> dict:
+        return {
+            'allowed_requests': self.allowed_requests,
+            'blocked_requests': self.blocked_requests,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'estimated_bytes_saved': self.estimated_bytes_saved,
+        }
+
+    @staticmethod
+    def _matches(host: str, domains) -> bool:
+        return any(host == domain or host.endswith('.' + domain) for domain in domains)
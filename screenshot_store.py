@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import random
+import re
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Names written by ScreenshotStore.capture; retention never touches anything else
+# (FormRecorder's form_initial_<seconds>.png has a 10-digit timestamp, not 13)
+SCREENSHOT_NAME = re.compile(r'^form_[\w-]+_\d{13,}\.(jpg|png)$')
+
+
+class ScreenshotStore:
+    """Verification screenshots, sampled and capped by file count and total size.
+
+    ``mode`` is ``form`` (clipped to the form element), ``viewport`` or
+    ``full_page``. Images are encoded by the browser; writes and retention
+    sweeps run in a worker thread so the event loop never blocks on disk I/O.
+    The oldest files are deleted first; only files named like the store's own
+    captures count towards the caps or are ever deleted.
+    """
+
+    def __init__(self, directory="fill_screenshots", sample_rate=0.05, image_format='jpeg',
+                 quality=70, mode='form', max_files=200, max_bytes=50 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.image_format = image_format
+        self.quality = quality
+        self.mode = mode
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.saved = 0
+        self.deleted = 0
+
+    def should_sample(self) -> bool:
+        return random.random() < self.sample_rate
+
+    async def capture(self, page, reason: str) -> Path:
+        """Screenshot ``page`` and save it under a name tagged with ``reason``."""
+        options = {'type': self.image_format}
+        if self.image_format == 'jpeg':
+            options['quality'] = self.quality
+        if self.mode == 'form':
+            data = await page.locator('form').first.screenshot(**options)
+        else:
+            data = await page.screenshot(full_page=self.mode == 'full_page', **options)
+        extension = 'jpg' if self.image_format == 'jpeg' else 'png'
+        return await self.save(data, f"form_{reason}_{int(time.time() * 1000)}.{extension}")
+
+    async def save(self, data: bytes, name: str) -> Path:
+        """Write ``data`` as ``name`` and apply the retention policy."""
+        return await asyncio.to_thread(self._save, data, name)
+
+    def _save(self, data: bytes, name: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / name
+        path.write_bytes(data)
+        self.saved += 1
+        self._apply_retention()
+        return path
+
+    def _apply_retention(self):
+        files = []
+        for path in self.directory.iterdir():
+            if path.is_file() and SCREENSHOT_NAME.match(path.name):
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        while files and (len(files) > self.max_files or total > self.max_bytes):
+            _, size, path = files.pop(0)
+            try:
+                path.unlink()
+                self.deleted += 1
+                total -= size
+            except OSError as e:
+                logger.error(f"Error deleting old screenshot {path}: {str(e)}")
+
+    def stats(self) -> dict:
+        return {'saved': self.saved, 'deleted': self.deleted}
@@ -0,0 +1,64 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age() -> float:
+    """Seconds since this process was created, or 0.0 where /proc isn't available."""
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+class StartupReport:
+    """Timings of the bot's start-up phases, from process creation until it is ready and warm.
+
+    ``ready`` means updates are being accepted; ``warm`` means background
+    prewarming of lazily loaded components has finished as well.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter() - _process_age()
+        self.phases = {'interpreter': time.perf_counter() - self._origin}
+        self.ready_after = None
+        self.warm_after = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def mark_ready(self):
+        self.ready_after = time.perf_counter() - self._origin
+        logger.info(f"Ready for updates {self.ready_after:.2f}s after process start ({self.summary()})")
+
+    def mark_warm(self):
+        self.warm_after = time.perf_counter() - self._origin
+        logger.info(f"Prewarm finished {self.warm_after:.2f}s after process start")
+
+    def summary(self) -> str:
+        return ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+
+    def stats(self) -> dict:
+        return {
+            'ready': self.ready_after is not None,
+            'warm': self.warm_after is not None,
+            'ready_seconds': self.ready_after or 0.0,
+            'warm_seconds': self.warm_after or 0.0,
+            'phase_seconds': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+
+
+# Process-wide report; bot.py imports this first so import phases are captured
+STARTUP = StartupReport()
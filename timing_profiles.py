@@ -0,0 +1,88 @@
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class TimingProfile:
+    """Waits and per-field budgets (all in milliseconds) used while filling the form.
+
+    ``wait_for_ready_signals`` switches the filler from fixed sleeps to waiting on
+    real readiness signals (element attached/enabled, Select2 results rendered,
+    input values committed). ``type_delay_ms`` of 0 means values are set with a
+    single bulk ``fill`` instead of per-character typing.
+    """
+
+    FIELDS = (
+        'name', 'wait_for_network_idle', 'wait_for_ready_signals', 'load_settle_ms',
+        'scroll_pause_ms', 'field_pause_ms', 'select2_open_ms', 'type_delay_ms',
+        'hold_open_ms', 'form_timeout_ms', 'default_budget_ms', 'field_budgets_ms',
+    )
+
+    def __init__(self, name, wait_for_network_idle=False, wait_for_ready_signals=True,
+                 load_settle_ms=0, scroll_pause_ms=0, field_pause_ms=0, select2_open_ms=0,
+                 type_delay_ms=0, hold_open_ms=0, form_timeout_ms=10000,
+                 default_budget_ms=5000, field_budgets_ms=None):
+        self.name = name
+        self.wait_for_network_idle = wait_for_network_idle
+        self.wait_for_ready_signals = wait_for_ready_signals
+        self.load_settle_ms = load_settle_ms
+        self.scroll_pause_ms = scroll_pause_ms
+        self.field_pause_ms = field_pause_ms
+        self.select2_open_ms = select2_open_ms
+        self.type_delay_ms = type_delay_ms
+        self.hold_open_ms = hold_open_ms
+        self.form_timeout_ms = form_timeout_ms
+        self.default_budget_ms = default_budget_ms
+        self.field_budgets_ms = dict(field_budgets_ms or {})
+
+    def budget(self, field: str) -> int:
+        """Timeout budget for a single field, falling back to the default budget."""
+        return self.field_budgets_ms.get(field, self.default_budget_ms)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TimingProfile":
+        unknown = set(data) - set(cls.FIELDS)
+        if unknown:
+            logger.warning(f"Ignoring unknown timing profile keys: {sorted(unknown)}")
+        return cls(**{k: v for k, v in data.items() if k in cls.FIELDS})
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path) -> "TimingProfile":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+# Mirrors the original fixed-sleep behaviour of submit_form
+HUMAN_LIKE = TimingProfile(
+    name='human',
+    wait_for_network_idle=True,
+    wait_for_ready_signals=False,
+    load_settle_ms=5000,
+    scroll_pause_ms=1000,
+    field_pause_ms=1000,
+    select2_open_ms=1000,
+    type_delay_ms=100,
+    hold_open_ms=10000,
+)
+
+FAST = TimingProfile(name='fast')
+
+PROFILES = {profile.name: profile for profile in (HUMAN_LIKE, FAST)}
+
+
+def get_timing_profile(name_or_path: str) -> TimingProfile:
+    """Resolve a built-in profile name, or load a profile saved as JSON."""
+    if name_or_path in PROFILES:
+        return PROFILES[name_or_path]
+    if Path(name_or_path).is_file():
+        return TimingProfile.load(name_or_path)
+    raise ValueError(f"Unknown timing profile: {name_or_path}")
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different chats in parallel while keeping each chat ordered.
+
+    ``max_active_updates`` bounds how many handlers run at once across all chats.
+    The base class semaphore (``max_pending_updates``) bounds how many updates may
+    be admitted at all, i.e. running plus waiting for their chat or a free slot.
+    Per-chat locks are taken before the global slot, so a busy chat queues behind
+    itself without holding slots other chats could use.
+    """
+
+    def __init__(self, max_active_updates: int = 32, max_pending_updates: int = 1024):
+        super().__init__(max(max_pending_updates, max_active_updates, 2))
+        self.max_active_updates = max_active_updates
+        self._active_slots = asyncio.Semaphore(max_active_updates)
+        self._chat_locks = {}
+
+        self.queued = 0
+        self.active = 0
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update, coroutine):
+        chat_id = self._chat_id(update)
+        ticket = {'enqueued_at': time.monotonic(), 'started': False}
+        self.queued += 1
+        try:
+            if chat_id is None:
+                await self._run(coroutine, ticket)
+                return
+
+            entry = self._chat_locks.setdefault(chat_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    await self._run(coroutine, ticket)
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._chat_locks[chat_id]
+        finally:
+            if not ticket['started']:
+                # Cancelled while still waiting for the chat or a slot
+                self.queued -= 1
+
+    async def _run(self, coroutine, ticket: dict):
+        async with self._active_slots:
+            waited = time.monotonic() - ticket['enqueued_at']
+            ticket['started'] = True
+            self.queued -= 1
+            self.active += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+                self.processed += 1
+
+    @staticmethod
+    def _chat_id(update):
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+        return None
+
+    def stats(self) -> dict:
+        """Return queue depth, concurrency and wait-time metrics."""
+        return {
+            'queue_depth': self.queued,
+            'active': self.active,
+            'processed': self.processed,
+            'chats_in_flight': len(self._chat_locks),
+            'avg_wait_seconds': self.total_wait / self.processed if self.processed else 0.0,
+            'max_wait_seconds': self.max_wait,
+        }
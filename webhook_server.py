@@ -0,0 +1,113 @@
+import hmac
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from telegram import Update
+from metrics import render_metrics
+from persistence import shard_for
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Set on updates passed between replicas so a misconfigured peer can't bounce them back
+FORWARDED_HEADER = "X-Forwarded-By-Shard"
+
+
+def create_webhook_app(bot, webhook_url: str, webhook_path: str, secret_token: str,
+                       shard_index: int = 0, shard_count: int = 1, shard_peers: list = None) -> FastAPI:
+    """Build an ASGI app that feeds Telegram webhook updates into ``bot.app``.
+
+    The app owns the Application lifecycle: it initializes and starts it on
+    startup, registers the webhook with Telegram, and stops it on shutdown.
+
+    With ``shard_count`` above 1, updates for chats of another shard are
+    forwarded to that shard's replica in ``shard_peers``, so any replica can
+    sit behind the public webhook URL.
+    """
+    application = bot.app
+    forwarding = {'session': None}
+
+    async def forward(shard: int, payload: dict) -> Response:
+        if forwarding['session'] is None:
+            import aiohttp
+            forwarding['session'] = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        try:
+            async with forwarding['session'].post(
+                shard_peers[shard] + webhook_path,
+                json=payload,
+                headers={SECRET_TOKEN_HEADER: secret_token, FORWARDED_HEADER: str(shard_index)}
+            ) as response:
+                return Response(status_code=200 if response.status == 200 else 503)
+        except Exception as e:
+            # Telegram redelivers the update after a non-2xx answer
+            logger.error(f"Error forwarding update to shard {shard}: {str(e)}")
+            return Response(status_code=503)
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.bot.set_webhook(
+            url=webhook_url.rstrip('/') + webhook_path,
+            secret_token=secret_token,
+            allowed_updates=Update.ALL_TYPES
+        )
+        await application.start()
+        logger.info(f"Webhook server ready on {webhook_path}")
+        try:
+            yield
+        finally:
+            if forwarding['session'] is not None:
+                await forwarding['session'].close()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+            await application.shutdown()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+
+    api = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+
+    @api.post(webhook_path)
+    async def telegram_webhook(request: Request):
+        received = request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not secret_token or not hmac.compare_digest(received, secret_token):
+            logger.warning("Rejected webhook call with an invalid secret token")
+            return Response(status_code=403)
+        try:
+            payload = await request.json()
+            update = Update.de_json(payload, application.bot)
+        except Exception as e:
+            logger.error(f"Invalid webhook payload: {str(e)}")
+            return Response(status_code=400)
+        chat = update.effective_chat
+        if shard_count > 1 and chat:
+            shard = shard_for(chat.id, shard_count)
+            if shard != shard_index:
+                if FORWARDED_HEADER not in request.headers:
+                    return await forward(shard, payload)
+                logger.warning(f"Update for shard {shard} was forwarded here by shard "
+                               f"{request.headers[FORWARDED_HEADER]}, handling it locally")
+        await application.update_queue.put(update)
+        return Response(status_code=200)
+
+    @api.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @api.get("/metrics")
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+    @api.get("/readyz")
+    async def readyz():
+        ready = application.running
+        return JSONResponse(
+            {"status": "ready" if ready else "starting", **bot.stats()},
+            status_code=200 if ready else 503
+        )
+
+    return api